@@ -13,44 +13,43 @@ Advanced Streamlit application with:
 
 import streamlit as st
 import os
+import time
+from collections import deque
 from dotenv import load_dotenv
 from typing import List, Optional
-import time
 
-# Import core modules
-from core.pdf_parser import EnhancedPDFParser
-from core.embedder import EnhancedEmbedder
-from core.retrieval import RetrievalEngine
-from core.qa_engine import EnhancedQAEngine
+# Core modules (pdfplumber, FAISS, numpy, google-generativeai) are imported
+# inside the functions that need them so the first page renders without them
 
 # Import UI components
 from ui.components import (
-    render_chat_message, render_streaming_message, render_source_citations,
+    render_chat_message, render_source_citations,
     render_sidebar_stats, render_history_panel, render_summarization_buttons,
     render_error_message, render_success_message, render_info_message,
     render_warning_message, get_premium_css
 )
 
-# Utilities
-from utils.helpers import chunk_text_by_tokens
-
-# Load environment variables
-load_dotenv()
 
 # -------------------------------
 # PAGE CONFIGURATION
 # -------------------------------
-st.set_page_config(
-    page_title="PDF Q&A Bot - Gemini AI",
-    page_icon="📄",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+def configure_page():
+    # Load environment variables
+    load_dotenv()
+    st.set_page_config(
+        page_title="PDF Q&A Bot - Gemini AI",
+        page_icon="📄",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
 
 # -------------------------------
 # FLOATING ANIMATED BACKGROUND
 # -------------------------------
-st.markdown("""
+# The blobs are the only blurred layer: glass elements sit on it with
+# translucent backgrounds rather than their own backdrop-filter, which would
+# be recomputed every frame while the blobs move
+BACKGROUND_HTML = """
 <style>
 .bg-blob {
     position: fixed;
@@ -96,34 +95,56 @@ st.markdown("""
 <div class="bg-blob bg-blob-1"></div>
 <div class="bg-blob bg-blob-2"></div>
 <div class="bg-blob bg-blob-3"></div>
-""", unsafe_allow_html=True)
-
+"""
 
 
 # -------------------------------
 # THEME + CSS
 # -------------------------------
+@st.cache_resource(show_spinner=False)
+def _page_style(theme: str) -> str:
+    """
+    Background blobs and theme CSS combined into one markdown payload
+
+    Cached as a resource: the string is immutable, so every rerun can share
+    it instead of unpickling a fresh copy as st.cache_data would.
+    """
+    return BACKGROUND_HTML + get_premium_css(theme)
+
+
 def apply_theme():
+    # Streamlit drops elements that aren't re-emitted on a rerun, so the
+    # styles are written every time, as a single element; only building
+    # the payload is cached. Guarding this with a session_state flag would
+    # leave the app unstyled from the second rerun on.
     theme = st.session_state.get("theme", "light")
-    st.markdown(get_premium_css(theme), unsafe_allow_html=True)
-
-apply_theme()
+    st.markdown(_page_style(theme), unsafe_allow_html=True)
 
 
 # -------------------------------
 # SESSION STATE INITIALIZATION
 # -------------------------------
+# Number of most recent messages sent to the model as conversation context
+RECENT_CONTEXT_SIZE = 10
+
+# Minimum seconds between streamed answer repaints
+STREAM_FLUSH_INTERVAL = 0.03
+
+
 def initialize_session_state():
     defaults = {
         "chat_history": [],
+        "recent_context": deque(maxlen=RECENT_CONTEXT_SIZE),
         "pdf_data": [],
         "all_chunks": [],
         "embedder": None,
         "retrieval_engine": None,
         "qa_engine": None,
+        "query_cache": None,
         "processing_complete": False,
         "uploaded_files_names": [],
         "total_pages": 0,
+        "document_set_key": None,
         "streaming_enabled": True,
         "theme": "light",
     }
@@ -132,7 +153,10 @@ def initialize_session_state():
             st.session_state[key] = default
 
 
-initialize_session_state()
+def add_chat_message(message: dict):
+    """Record a message in the full UI history and the bounded prompt context"""
+    st.session_state.chat_history.append(message)
+    st.session_state.recent_context.append(message)
 
 
 # -------------------------------
@@ -153,24 +177,96 @@ def get_api_key() -> Optional[str]:
 
 
 
+# -------------------------------
+# SHARED RESOURCES
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def get_qa_engine(api_key: str):
+    """Build (and health-check) one QA engine per API key across reruns"""
+    from core.qa_engine import EnhancedQAEngine
+
+    qa = EnhancedQAEngine(api_key)
+    qa.test_connection()
+    return qa
+
+
 # -------------------------------
 # PROCESS PDFS
 # -------------------------------
 def process_pdfs(uploaded_files, api_key, use_ocr=False, extract_tables=True, extract_images=False, fast_mode=True):
 
+    # Re-clicking with the same files and options is a no-op
+    fingerprint = (
+        tuple((f.name, f.size) for f in uploaded_files),
+        use_ocr, extract_tables, extract_images, fast_mode,
+    )
+    if st.session_state.get("_processed_fp") == fingerprint and st.session_state.processing_complete:
+        render_info_message("These PDFs are already processed.")
+        return True
+
+    st.session_state.chat_history = []
+    st.session_state.recent_context.clear()
+    st.session_state._summary_cache = {}
+
     try:
-        parser = EnhancedPDFParser()
+        import numpy as np
+        from core.pdf_parser import get_default_parser
+        from core.embedder import EnhancedEmbedder
+        from core.retrieval import RetrievalEngine
+        from core.pipeline import DocumentPipeline
+        from core.cache import INDEX_CACHE_DIR, ProcessingCache, SemanticQueryCache, document_set_key
+
+        parser = get_default_parser()
+        embedder = EnhancedEmbedder(api_key)
+        cache = ProcessingCache()
 
-        with st.spinner("📄 Extracting text..."):
-            files_data = [(f.name, f.read()) for f in uploaded_files]
-            results = parser.extract_from_multiple_pdfs(
-                files_data,
-                use_ocr=use_ocr,
-                extract_tables=extract_tables,
-                extract_images=extract_images
-            )
+        chunk_size = 1400 if fast_mode else 900
+        overlap = 20 if fast_mode else 50
 
-        success_results = [r for r in results if r["success"]]
+        with st.spinner("📄 Extracting, chunking and embedding..."):
+            # Uploads are already in memory; pass them through instead of copying
+            files_data = [(f.name, f) for f in uploaded_files]
+
+            # Reuse extraction, chunks and embeddings of previously processed files
+            cache_keys = [
+                cache.make_key(
+                    file_bytes, filename,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_images=extract_images,
+                    fast_mode=fast_mode,
+                )
+                for filename, file_bytes in files_data
+            ]
+            entries = [cache.load(key) for key in cache_keys]
+            missing = [i for i, entry in enumerate(entries) if entry is None]
+
+            if missing:
+                # Parsing, chunking and embedding overlap across documents
+                pipeline = DocumentPipeline(parser, embedder, chunk_size=chunk_size, overlap=overlap, cache=cache)
+                progress = st.progress(0.0)
+                processed = pipeline.run(
+                    [files_data[i] for i in missing],
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_images=extract_images,
+                    progress_callback=lambda done, total: progress.progress(done / total)
+                )
+                progress.empty()
+
+                for i, entry in zip(missing, processed):
+                    entries[i] = entry
+                    # Zero rows are failed API calls and skipped OCR can be
+                    # retried; don't make either permanent
+                    if (
+                        entry["result"]["success"]
+                        and not entry["result"].get("ocr_incomplete")
+                        and np.any(entry["embeddings"], axis=1).all()
+                    ):
+                        cache.save(cache_keys[i], entry["result"], entry["chunks"], entry["embeddings"])
+
+        success = [i for i, entry in enumerate(entries) if entry["result"]["success"]]
+        success_results = [entries[i]["result"] for i in success]
 
         if not success_results:
             render_error_message("Failed to extract data from PDFs.")
@@ -182,42 +278,30 @@ def process_pdfs(uploaded_files, api_key, use_ocr=False, extract_tables=True, ex
 
         render_success_message(f"Successfully extracted {len(success_results)} PDFs.")
 
-        # Chunking
-        chunk_size = 1400 if fast_mode else 900
-        overlap = 20 if fast_mode else 50
-
-        with st.spinner("🔪 Chunking text..."):
-            all_chunks = []
-            for res in success_results:
-                chunks = chunk_text_by_tokens(
-                    res.get("text", ""),
-                    chunk_size=chunk_size,
-                    overlap=overlap,
-                    metadata={"filename": res["filename"]}
-                )
-                all_chunks.extend(chunks)
-
+        all_chunks = [c for i in success for c in entries[i]["chunks"]]
         st.session_state.all_chunks = all_chunks
 
-        # Embeddings
-        embedder = EnhancedEmbedder(api_key)
+        document_keys = [cache_keys[i] for i in success]
+        st.session_state.document_set_key = document_set_key(document_keys)
+        index_dir = os.path.join(INDEX_CACHE_DIR, st.session_state.document_set_key)
 
-        with st.spinner("🧠 Creating embeddings..."):
-            texts = [c["text"] for c in all_chunks]
-            metas = [c["metadata"] for c in all_chunks]
-            embedder.create_embeddings(
-                [{"text": t, "metadata": m} for t, m in zip(texts, metas)]
-            )
+        with st.spinner("🧠 Building search index..."):
+            # A previously built index for this exact set skips indexing
+            if missing or not embedder.load(index_dir):
+                embeddings = np.concatenate([entries[i]["embeddings"] for i in success])
+                if all_chunks and embedder.add_embeddings(all_chunks, embeddings):
+                    if np.any(embeddings, axis=1).all():
+                        embedder.save(index_dir)
 
         st.session_state.embedder = embedder
         st.session_state.retrieval_engine = RetrievalEngine(embedder)
+        st.session_state.query_cache = SemanticQueryCache.for_documents(document_keys)
 
         # QA engine
-        qa = EnhancedQAEngine(api_key)
-        qa.test_connection()
-        st.session_state.qa_engine = qa
+        st.session_state.qa_engine = get_qa_engine(api_key)
 
         st.session_state.processing_complete = True
+        st.session_state._processed_fp = fingerprint
         return True
 
     except Exception as e:
@@ -230,57 +314,107 @@ def process_pdfs(uploaded_files, api_key, use_ocr=False, extract_tables=True, ex
 # HANDLE QUESTION
 # -------------------------------
 def handle_question(question: str, stream=True):
+    from core.qa_engine import STREAM_FALLBACK_ERRORS
 
     if not st.session_state.retrieval_engine:
         render_error_message("Please process PDFs first.")
         return
 
-    st.session_state.chat_history.append({"role": "user", "content": question})
+    add_chat_message({"role": "user", "content": question})
     render_chat_message("user", question)
 
+    # Rephrased repeats of an earlier question reuse its answer
+    query_cache = st.session_state.query_cache
+    try:
+        question_embedding = st.session_state.embedder.embed_query(question)
+        cached = query_cache.lookup(question_embedding) if query_cache else None
+    except Exception:
+        question_embedding, cached = None, None
+
+    if cached:
+        render_chat_message("assistant", cached["answer"])
+        render_source_citations(cached["sources"])
+        add_chat_message(
+            {"role": "assistant", "content": cached["answer"], "sources": cached["sources"]}
+        )
+        return
+
     with st.spinner("🔍 Finding relevant information..."):
         context, sources = st.session_state.retrieval_engine.get_context_for_qa(
-            question, top_k=5
+            question, top_k=5, query_embedding=question_embedding
         )
 
     if not sources:
         ans = "No relevant information found."
         render_chat_message("assistant", ans)
-        st.session_state.chat_history.append({"role": "assistant", "content": ans})
+        add_chat_message({"role": "assistant", "content": ans})
         return
 
+    # Conversation context is already capped by the deque; snapshot it once
+    recent = list(st.session_state.recent_context)
+
     # Streaming mode
     if stream and st.session_state.streaming_enabled:
         placeholder = st.empty()
-        full = ""
-        try:
-            for token in st.session_state.qa_engine.answer_question_stream(
-                question, context, sources, st.session_state.chat_history[-10:]
+        streamed = []
+
+        def tokens():
+            # Coalesce tokens so the answer is repainted at most every
+            # STREAM_FLUSH_INTERVAL seconds
+            buffered = []
+            last_flush = time.monotonic()
+            for token in st.session_state.qa_engine.answer_question_stream_background(
+                question, context, sources, recent
             ):
-                full += token
-                render_streaming_message(placeholder, full)
-                time.sleep(0.01)
+                streamed.append(token)
+                buffered.append(token)
+                now = time.monotonic()
+                if now - last_flush >= STREAM_FLUSH_INTERVAL:
+                    yield "".join(buffered)
+                    buffered.clear()
+                    last_flush = now
+            if buffered:
+                yield "".join(buffered)
 
-            st.markdown(
+        try:
+            # st.write_stream renders tokens incrementally instead of
+            # repainting the whole answer on every token
+            with placeholder.container():
+                st.write_stream(tokens())
+            full = "".join(streamed)
+            answered = True
+        except STREAM_FALLBACK_ERRORS:
+            # Keep what was already streamed and only generate the rest
+            full = "".join(streamed)
+            result = st.session_state.qa_engine.answer_question(
+                question, context, sources, recent,
+                partial_answer=full or None
+            )
+            full = full + result["answer"] if result["success"] else result["answer"]
+            answered = result["success"]
+            placeholder.markdown(
                 f'<div class="chat-bubble chat-bubble-assistant">{full}</div>',
                 unsafe_allow_html=True,
             )
-        except:
-            result = st.session_state.qa_engine.answer_question(
-                question, context, sources, st.session_state.chat_history[-10:]
-            )
-            full = result["answer"]
-            placeholder.markdown(full)
+        except Exception as e:
+            placeholder.empty()
+            render_error_message("Answer generation failed", str(e))
+            return
 
     else:
         result = st.session_state.qa_engine.answer_question(
-            question, context, sources, st.session_state.chat_history[-10:]
+            question, context, sources, recent
         )
         full = result["answer"]
+        answered = result["success"]
         render_chat_message("assistant", full)
 
     render_source_citations(sources)
-    st.session_state.chat_history.append({"role": "assistant", "content": full, "sources": sources})
+    add_chat_message({"role": "assistant", "content": full, "sources": sources})
+
+    # Failed answers are shown once but never served again from the cache
+    if query_cache and question_embedding is not None and full and answered:
+        query_cache.add(question_embedding, question, full, sources)
 
 
 
@@ -298,13 +432,37 @@ def handle_summarization(summary_type: str):
         render_error_message("QA engine not initialized.")
         return
 
-    all_text = "\n\n".join([r.get("text", "") for r in st.session_state.pdf_data])
+    # Content-based key computed once when the PDFs were processed
+    pdfs_key = st.session_state.document_set_key
+    summary_cache = st.session_state.setdefault("_summary_cache", {})
 
     try:
-        summary = qa.summarize(all_text, summary_type=summary_type)
+        summary = summary_cache.get(("set", pdfs_key, summary_type))
+        if summary is None:
+            # Map: summarize each PDF on its own, concurrently, reusing
+            # earlier per-PDF summaries
+            pdf_data = st.session_state.pdf_data
+            missing = [r for r in pdf_data if ("pdf", r["filename"], summary_type) not in summary_cache]
+            new_summaries = qa.summarize_many([r.get("text", "") for r in missing], summary_type=summary_type)
+            for r, pdf_summary in zip(missing, new_summaries):
+                if pdf_summary.startswith("Error:"):
+                    raise RuntimeError(pdf_summary)
+                summary_cache[("pdf", r["filename"], summary_type)] = pdf_summary
+            pdf_summaries = [summary_cache[("pdf", r["filename"], summary_type)] for r in pdf_data]
+
+            # Reduce: merge the per-PDF summaries
+            if len(pdf_summaries) == 1:
+                summary = pdf_summaries[0]
+            else:
+                merged = "\n\n".join(f"{r['filename']}:\n{text}" for r, text in zip(pdf_data, pdf_summaries))
+                summary = qa.summarize(merged, summary_type=summary_type)
+                if summary.startswith("Error:"):
+                    raise RuntimeError(summary)
+            summary_cache[("set", pdfs_key, summary_type)] = summary
+
         st.markdown("### 📝 Summary")
         st.markdown(summary)
-        st.session_state.chat_history.append({
+        add_chat_message({
             "role": "assistant",
             "content": summary
         })
@@ -358,7 +516,6 @@ def main():
         )
         
         if process_button and can_process:
-            st.session_state.chat_history = []
             success = process_pdfs(
                 uploaded_files, api_key,
                 use_ocr=use_ocr,
@@ -417,6 +574,9 @@ def main():
         handle_question(user_question)
 
 
-# Run app
+# Run app. Extraction workers started with forkserver/spawn re-import this
+# script as __mp_main__, so nothing with side effects may run outside here
 if __name__ == "__main__":
+    configure_page()
+    apply_theme()
     main()
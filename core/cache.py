@@ -0,0 +1,305 @@
+"""Content-addressed disk cache for extracted PDFs, chunks, and embeddings"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import BinaryIO, Dict, List, Optional, Union
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "pdf")
+QUERY_CACHE_DIR = os.path.join(".cache", "qcache")
+INDEX_CACHE_DIR = os.path.join(".cache", "faiss")
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def document_set_key(document_keys: List[str]) -> str:
+    """
+    Build an order-independent key for a set of processed PDFs
+    
+    Args:
+        document_keys: ProcessingCache keys of the PDFs
+        
+    Returns:
+        Hex key
+    """
+    return hashlib.sha256("\n".join(sorted(document_keys)).encode("utf-8")).hexdigest()
+
+
+class ProcessingCache:
+    """Cache per-PDF processing output keyed by file content and options"""
+    
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Initialize the cache
+        
+        Args:
+            cache_dir: Directory holding cached entries
+        """
+        self.cache_dir = cache_dir
+        self.logger = logger
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def make_key(self, file_bytes: Union[bytes, BinaryIO], filename: str, **options) -> str:
+        """
+        Build a cache key from PDF content, filename and processing options
+        
+        Args:
+            file_bytes: PDF content as bytes or a seekable binary file object
+            filename: Name of the PDF file (stored in chunk metadata)
+            **options: Processing options that change the output
+            
+        Returns:
+            Hex cache key
+        """
+        digest = hashlib.sha256()
+        if isinstance(file_bytes, (bytes, bytearray, memoryview)):
+            digest.update(file_bytes)
+        elif hasattr(file_bytes, "getbuffer"):
+            # In-memory uploads (BytesIO) are hashed in place, without copying
+            with file_bytes.getbuffer() as view:
+                digest.update(view)
+        else:
+            # Hash file objects in blocks instead of reading them whole
+            file_bytes.seek(0)
+            for block in iter(lambda: file_bytes.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+            file_bytes.seek(0)
+        digest.update(filename.encode("utf-8"))
+        suffix = "_".join(f"{name}={options[name]}" for name in sorted(options))
+        return f"{digest.hexdigest()}_{suffix}" if suffix else digest.hexdigest()
+    
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        Load a cached entry
+        
+        Args:
+            key: Cache key from make_key
+            
+        Returns:
+            Dict with 'result', 'chunks' and 'embeddings', or None on a miss
+        """
+        pkl_path, npy_path = self._paths(key)
+        if not (os.path.exists(pkl_path) and os.path.exists(npy_path)):
+            return None
+            
+        try:
+            with open(pkl_path, "rb") as f:
+                entry = pickle.load(f)
+            entry["embeddings"] = np.load(npy_path).astype(np.float32)
+            self.logger.info(f"Cache hit for {entry['result'].get('filename', key)}")
+            return entry
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {key}: {str(e)}")
+            return None
+    
+    def save(self, key: str, result: Dict, chunks: List[Dict], embeddings: np.ndarray):
+        """
+        Atomically write a cache entry
+        
+        Args:
+            key: Cache key from make_key
+            result: Extraction result for the PDF
+            chunks: Chunks created from the PDF text
+            embeddings: Embedding rows aligned with `chunks`
+        """
+        pkl_path, npy_path = self._paths(key)
+        try:
+            # Embeddings are stored as float16 to halve the file size
+            self._atomic_write(
+                npy_path,
+                lambda f: np.save(f, np.asarray(embeddings, dtype=np.float16))
+            )
+            self._atomic_write(
+                pkl_path,
+                lambda f: pickle.dump(
+                    {"result": result, "chunks": chunks}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not write cache entry {key}: {str(e)}")
+    
+    def load_extraction(self, key: str) -> Optional[Dict]:
+        """
+        Load a cached extraction result
+        
+        Args:
+            key: Cache key from make_key built from extraction options only
+            
+        Returns:
+            Extraction result dict, or None on a miss
+        """
+        path = self._extraction_path(key)
+        if not os.path.exists(path):
+            return None
+            
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            self.logger.info(f"Extraction cache hit for {result.get('filename', key)}")
+            return result
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable extraction cache entry {key}: {str(e)}")
+            return None
+    
+    def save_extraction(self, key: str, result: Dict):
+        """
+        Atomically write an extraction result
+        
+        Extraction (and OCR in particular) is the expensive CPU stage, so it
+        is kept on its own: it survives failed embedding runs and is shared
+        between chunking settings.
+        
+        Args:
+            key: Cache key from make_key built from extraction options only
+            result: Successful extraction result for the PDF
+        """
+        try:
+            self._atomic_write(
+                self._extraction_path(key),
+                lambda f: pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not write extraction cache entry {key}: {str(e)}")
+    
+    def _extraction_path(self, key: str) -> str:
+        """Return the extraction pickle path for a key"""
+        return os.path.join(self.cache_dir, f"{key}.extract.pkl")
+    
+    def _paths(self, key: str):
+        """Return the (pickle, numpy) paths for a key"""
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.pkl", f"{base}.npy"
+    
+    def _atomic_write(self, path: str, write):
+        """Write via a temporary file and rename so readers never see partial data"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+class SemanticQueryCache:
+    """Remember answers by question embedding so rephrased questions are free"""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.15,
+        dimension: int = 768
+    ):
+        """
+        Initialize the query cache
+        
+        Args:
+            path: Optional pickle file used to persist the cache between sessions
+            threshold: Maximum (squared L2) distance for a question to count as a repeat
+            dimension: Embedding dimension
+        """
+        import faiss
+        
+        self.path = path
+        self.threshold = threshold
+        self.logger = logger
+        self.index = faiss.IndexFlatL2(dimension)
+        self.entries: List[Dict] = []
+        
+        if path and os.path.exists(path):
+            self._load()
+    
+    @classmethod
+    def for_documents(
+        cls,
+        document_keys: List[str],
+        cache_dir: str = QUERY_CACHE_DIR
+    ) -> "SemanticQueryCache":
+        """
+        Open the persisted query cache for a set of processed documents
+        
+        Args:
+            document_keys: ProcessingCache keys of the loaded PDFs
+            cache_dir: Directory holding query caches
+            
+        Returns:
+            SemanticQueryCache scoped to exactly this document set
+        """
+        return cls(path=os.path.join(cache_dir, f"{document_set_key(document_keys)}.pkl"))
+    
+    def lookup(self, query_embedding: np.ndarray) -> Optional[Dict]:
+        """
+        Find the stored answer for a near-identical question
+        
+        Args:
+            query_embedding: Question embedding of shape (1, dimension)
+            
+        Returns:
+            Dict with 'question', 'answer' and 'sources', or None on a miss
+        """
+        if self.index.ntotal == 0:
+            return None
+        
+        distances, indices = self.index.search(
+            np.asarray(query_embedding, dtype=np.float32), 1
+        )
+        if indices[0][0] >= 0 and distances[0][0] < self.threshold:
+            return self.entries[indices[0][0]]
+        return None
+    
+    def add(
+        self,
+        query_embedding: np.ndarray,
+        question: str,
+        answer: str,
+        sources: List[Dict]
+    ):
+        """
+        Store an answer and persist the cache if a path was given
+        
+        Args:
+            query_embedding: Question embedding of shape (1, dimension)
+            question: Original question
+            answer: Generated answer
+            sources: Sources cited by the answer
+        """
+        self.index.add(np.asarray(query_embedding, dtype=np.float32))
+        self.entries.append({'question': question, 'answer': answer, 'sources': sources})
+        
+        if self.path:
+            self._save()
+    
+    def _load(self):
+        """Load persisted questions and rebuild the index"""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if len(data['entries']):
+                self.index.add(np.asarray(data['embeddings'], dtype=np.float32))
+                self.entries = data['entries']
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable query cache {self.path}: {str(e)}")
+    
+    def _save(self):
+        """Atomically persist questions, embeddings and answers"""
+        try:
+            cache_dir = os.path.dirname(self.path) or "."
+            os.makedirs(cache_dir, exist_ok=True)
+            data = {
+                'embeddings': self.index.reconstruct_n(0, self.index.ntotal),
+                'entries': self.entries,
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"Could not write query cache {self.path}: {str(e)}")
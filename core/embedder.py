@@ -1,31 +1,99 @@
 """Enhanced Embedder with FAISS vector store and improved chunking"""
 
+import hashlib
 import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Tuple, Optional
 import google.generativeai as genai
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of texts Gemini accepts in one batch embedding request
+EMBED_BATCH_LIMIT = 100
+
+# Dimension of models/embedding-001 vectors
+EMBEDDING_DIM = 768
+
+# Number of query embeddings kept by embed_query
+QUERY_CACHE_SIZE = 256
+
+# HNSW graph parameters (neighbours per node, build and search beam width);
+# below HNSW_MIN_VECTORS an exact scan is faster than the graph
+HNSW_MIN_VECTORS = 1000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Above IVFPQ_MIN_VECTORS, switch to IVFPQ (sqrt(N) lists, IVFPQ_M sub-vectors
+# of IVFPQ_NBITS bits each, IVFPQ_NPROBE lists scanned per query)
+IVFPQ_MIN_VECTORS = 5000
+IVFPQ_M = 32
+IVFPQ_NBITS = 8
+IVFPQ_NPROBE = 8
+
+# Vectors converted to float32 and added to the index per call, and the
+# maximum number of vectors used to train quantizers
+INDEX_ADD_BATCH = 8192
+INDEX_TRAIN_SAMPLE = 65536
+
+# File names used by save() / load()
+INDEX_FILE = "faiss.index"
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.pkl"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return C-contiguous float32 copies of the rows scaled to unit length (zero rows stay zero)"""
+    # FAISS needs C-contiguous float32 input; scale the copy in place
+    # rather than allocating a second array for the quotient
+    vectors = np.array(vectors, dtype=np.float32, order='C')
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
 
 class EnhancedEmbedder:
     """Enhanced embedder with FAISS and improved metadata tracking"""
     
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        batch_size: int = EMBED_BATCH_LIMIT,
+        max_workers: int = 16
+    ):
         """
         Initialize the embedder
         
         Args:
             api_key: Google Gemini API key
+            batch_size: Number of texts sent per embedding request
+            max_workers: Number of embedding requests kept in flight
         """
         self.api_key = api_key
+        self.batch_size = min(batch_size, EMBED_BATCH_LIMIT)
+        self.max_workers = max_workers
+        # Shared by all embed_texts calls so concurrent callers (e.g. one per
+        # PDF in the processing pipeline) stay within max_workers requests
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
         genai.configure(api_key=api_key)
         self.chunks = []
         self.embeddings = []
         self.metadata = []
         self.index = None
+        # Bumped whenever the index is replaced, so search caches can tell
+        self.index_version = 0
         self.logger = logger
+        # LRU of query text -> embedding; repeated queries skip the API call
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
     
     def create_embeddings(
         self,
@@ -49,45 +117,116 @@ class EnhancedEmbedder:
             
             self.logger.info(f"Creating embeddings for {len(text_chunks)} chunks...")
             
-            embeddings_list = []
-            total = len(text_chunks)
-            
-            for i, chunk_data in enumerate(text_chunks):
-                try:
-                    chunk_text = chunk_data.get('text', '')
-                    chunk_metadata = chunk_data.get('metadata', {})
-                    
-                    if not chunk_text:
-                        continue
-                    
-                    # Create embedding
-                    result = genai.embed_content(
-                        model="models/embedding-001",
-                        content=chunk_text,
-                        task_type="retrieval_document"
-                    )
-                    embeddings_list.append(result['embedding'])
-                    
-                    # Store chunk and metadata
-                    self.chunks.append(chunk_text)
-                    self.metadata.append(chunk_metadata)
-                    
-                    # Progress callback
-                    if progress_callback:
-                        progress_callback(i + 1, total)
-                    
-                    if (i + 1) % 10 == 0:
-                        self.logger.info(f"Processed {i + 1}/{total} chunks")
-                
-                except Exception as e:
-                    self.logger.error(f"Error embedding chunk {i}: {str(e)}")
-                    # Use zero vector as fallback
-                    embeddings_list.append([0.0] * 768)
-                    self.chunks.append(chunk_data.get('text', ''))
-                    self.metadata.append(chunk_data.get('metadata', {}))
-            
-            # Convert to numpy array
-            self.embeddings = np.array(embeddings_list, dtype=np.float32)
+            # Drop empty chunks up front so batches only carry real text
+            valid_chunks = [c for c in text_chunks if c.get('text', '')]
+            embeddings = self.embed_texts(
+                [c['text'] for c in valid_chunks],
+                progress_callback=progress_callback
+            )
+            
+            return self.add_embeddings(valid_chunks, embeddings)
+            
+        except Exception as e:
+            self.logger.error(f"Error creating embeddings: {str(e)}")
+            return False
+    
+    def embed_texts(
+        self,
+        texts: List[str],
+        progress_callback: Optional[callable] = None
+    ) -> np.ndarray:
+        """
+        Embed texts in concurrent batches without touching the index
+        
+        Args:
+            texts: Non-empty texts to embed
+            progress_callback: Optional callback function(progress, total)
+            
+        Returns:
+            float32 array with one row per text, in input order
+        """
+        if not texts:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        
+        # Repeated boilerplate (headers, footers, TOC fragments) is embedded once
+        unique_texts = []
+        unique_index = {}
+        row_for_text = []
+        for text in texts:
+            digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+            if digest not in unique_index:
+                unique_index[digest] = len(unique_texts)
+                unique_texts.append(text)
+            row_for_text.append(unique_index[digest])
+        
+        if len(unique_texts) < len(texts):
+            self.logger.info(f"Skipping {len(texts) - len(unique_texts)} duplicate chunks")
+        
+        total = len(unique_texts)
+        batches = [
+            unique_texts[i:i + self.batch_size]
+            for i in range(0, total, self.batch_size)
+        ]
+        # Batches write straight into their rows instead of growing a list
+        embeddings = np.empty((total, EMBEDDING_DIM), dtype=np.float32)
+        
+        # Embedding calls are network-bound: keep several batches in flight
+        futures = {
+            self._executor.submit(self._embed_batch_with_fallback, batch): b
+            for b, batch in enumerate(batches)
+        }
+        
+        done = 0
+        for future in as_completed(futures):
+            b = futures[future]
+            start = b * self.batch_size
+            embeddings[start:start + len(batches[b])] = future.result()
+            
+            done += len(batches[b])
+            if progress_callback:
+                progress_callback(done, total)
+            self.logger.info(f"Processed {done}/{total} chunks")
+        
+        # Expand back to one row per input text
+        if total == len(texts):
+            return embeddings
+        return embeddings[row_for_text]
+    
+    def _embed_batch_with_fallback(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch; if the request fails, retry each text on its own"""
+        try:
+            return self.embed_batch(texts)
+        except Exception as e:
+            self.logger.error(f"Error embedding batch of {len(texts)} chunks, retrying individually: {str(e)}")
+        
+        embeddings = []
+        for text in texts:
+            try:
+                embeddings.extend(self.embed_batch([text]))
+            except Exception as e:
+                self.logger.error(f"Error embedding chunk: {str(e)}")
+                # Use zero vector as fallback
+                embeddings.append([0.0] * EMBEDDING_DIM)
+        return embeddings
+    
+    def add_embeddings(self, text_chunks: List[Dict], embeddings: np.ndarray) -> bool:
+        """
+        Store precomputed embeddings (e.g. loaded from cache) and build the index
+        
+        Args:
+            text_chunks: List of dicts with 'text' and 'metadata' keys
+            embeddings: Array with one row per chunk
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self.chunks.extend(chunk_data['text'] for chunk_data in text_chunks)
+            self.metadata.extend(chunk_data.get('metadata', {}) for chunk_data in text_chunks)
+            
+            # Unit-normalize so inner product is cosine similarity, and keep
+            # a half-precision copy: halves RAM and is all the index needs
+            self.embeddings = _normalize(embeddings).astype(np.float16)
             
             # Create FAISS index
             self._create_faiss_index()
@@ -99,6 +238,28 @@ class EnhancedEmbedder:
             self.logger.error(f"Error creating embeddings: {str(e)}")
             return False
     
+    def embed_batch(
+        self,
+        texts: List[str],
+        task_type: str = "retrieval_document"
+    ) -> List[List[float]]:
+        """
+        Embed several texts with a single API request
+        
+        Args:
+            texts: Texts to embed (at most EMBED_BATCH_LIMIT)
+            task_type: Gemini embedding task type
+            
+        Returns:
+            List of embedding vectors, in the same order as `texts`
+        """
+        result = genai.embed_content(
+            model="models/embedding-001",
+            content=texts,
+            task_type=task_type
+        )
+        return result['embedding']
+    
     def _create_faiss_index(self):
         """Create FAISS index from embeddings"""
         try:
@@ -108,8 +269,44 @@ class EnhancedEmbedder:
                 raise ValueError("No embeddings to index")
             
             dimension = self.embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(dimension)
-            self.index.add(self.embeddings)
+            # 8 bits per dimension, with a trained per-dimension range
+            scalar_quantizer = faiss.ScalarQuantizer.QT_8bit
+            
+            if len(self.embeddings) < HNSW_MIN_VECTORS:
+                # Small corpora: an exact int8 scan beats walking a graph
+                self.index = faiss.IndexScalarQuantizer(
+                    dimension, scalar_quantizer, faiss.METRIC_INNER_PRODUCT
+                )
+            elif len(self.embeddings) <= IVFPQ_MIN_VECTORS:
+                # HNSW graph over int8 vectors: sub-linear top-k search with a
+                # quarter of the memory of float32, and it supports incremental adds
+                self.index = faiss.IndexHNSWSQ(
+                    dimension, scalar_quantizer, HNSW_M, faiss.METRIC_INNER_PRODUCT
+                )
+                self.index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+                self.index.hnsw.efSearch = HNSW_EF_SEARCH
+            else:
+                # Large corpora: product-quantized inverted lists store each
+                # vector in IVFPQ_M bytes and scan only IVFPQ_NPROBE lists
+                quantizer = faiss.IndexFlatIP(dimension)
+                nlist = int(math.sqrt(len(self.embeddings)))
+                self.index = faiss.IndexIVFPQ(
+                    quantizer, dimension, nlist, IVFPQ_M, IVFPQ_NBITS, faiss.METRIC_INNER_PRODUCT
+                )
+                self.index.nprobe = IVFPQ_NPROBE
+            # 8-bit scalar quantizers learn per-dimension min/max ranges here;
+            # IVFPQ centroids only need a sample of a large corpus
+            if not self.index.is_trained:
+                train = self.embeddings
+                if len(train) > INDEX_TRAIN_SAMPLE:
+                    rows = np.random.default_rng(0).choice(len(train), INDEX_TRAIN_SAMPLE, replace=False)
+                    train = train[np.sort(rows)]
+                self.index.train(train.astype(np.float32))
+            
+            # Add in slices so only one batch is ever held as float32
+            for start in range(0, len(self.embeddings), INDEX_ADD_BATCH):
+                self.index.add(self.embeddings[start:start + INDEX_ADD_BATCH].astype(np.float32))
+            self.index_version += 1
             
             self.logger.info(f"FAISS index created with {self.index.ntotal} vectors (dim={dimension})")
             
@@ -120,6 +317,61 @@ class EnhancedEmbedder:
             self.logger.error(f"Error creating FAISS index: {str(e)}")
             raise
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a search query
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            float32 array of shape (1, dimension)
+        """
+        cached = self._query_cache.get(query)
+        if cached is not None:
+            self._query_cache.move_to_end(query)
+            return cached
+        
+        result = genai.embed_content(
+            model="models/embedding-001",
+            content=query,
+            task_type="retrieval_query"
+        )
+        embedding = np.array([result['embedding']], dtype=np.float32)
+        embedding.setflags(write=False)
+        
+        self._query_cache[query] = embedding
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several search queries, batching the ones not cached yet
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            float32 array of shape (len(queries), dimension)
+        """
+        if not queries:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        
+        missing = list(dict.fromkeys(q for q in queries if q not in self._query_cache))
+        for start in range(0, len(missing), EMBED_BATCH_LIMIT):
+            batch = missing[start:start + EMBED_BATCH_LIMIT]
+            for query, vector in zip(batch, self.embed_batch(batch, task_type="retrieval_query")):
+                embedding = np.array([vector], dtype=np.float32)
+                embedding.setflags(write=False)
+                self._query_cache[query] = embedding
+        
+        embeddings = np.concatenate([self.embed_query(q) for q in queries])
+        
+        while len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embeddings
+    
     def search(
         self,
         query: str,
@@ -135,50 +387,166 @@ class EnhancedEmbedder:
             min_relevance: Minimum relevance score (0-1)
             
         Returns:
-            List of tuples: (chunk_text, metadata, distance, relevance_score)
+            List of tuples: (chunk_text, metadata, cosine_distance, relevance_score)
         """
         try:
             if self.index is None or len(self.chunks) == 0:
                 self.logger.warning("No index available for search")
                 return []
             
-            # Create query embedding
-            result = genai.embed_content(
-                model="models/embedding-001",
-                content=query,
-                task_type="retrieval_query"
-            )
-            query_embedding = np.array([result['embedding']], dtype=np.float32)
+            return self.search_by_vector(self.embed_query(query), top_k, min_relevance)
+            
+        except Exception as e:
+            self.logger.error(f"Error searching: {str(e)}")
+            return []
+    
+    def search_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        min_relevance: float = 0.0
+    ) -> List[Tuple[str, Dict, float, float]]:
+        """
+        Search for relevant chunks with an already computed query embedding
+        
+        Args:
+            query_embedding: Query embedding of shape (1, dimension), from embed_query
+            top_k: Number of results to return
+            min_relevance: Minimum relevance score (0-1)
+            
+        Returns:
+            List of tuples: (chunk_text, metadata, cosine_distance, relevance_score)
+        """
+        try:
+            if self.index is None or len(self.chunks) == 0:
+                self.logger.warning("No index available for search")
+                return []
             
             # Search in FAISS
             import faiss
             k = min(top_k, len(self.chunks))
-            distances, indices = self.index.search(query_embedding, k)
-            
-            # Prepare results with relevance scores
-            results = []
-            for dist, idx in zip(distances[0], indices[0]):
-                if idx < len(self.chunks):
-                    # Calculate relevance score (0-1)
-                    relevance = 1 / (1 + dist)  # Convert distance to similarity
-                    
-                    if relevance >= min_relevance:
-                        results.append((
-                            self.chunks[idx],
-                            self.metadata[idx],
-                            float(dist),
-                            float(relevance)
-                        ))
-            
-            # Sort by relevance (highest first)
-            results.sort(key=lambda x: x[3], reverse=True)
-            
-            return results[:top_k]
+            if hasattr(self.index, 'hnsw'):
+                # The search beam must be at least as wide as the result list
+                self.index.hnsw.efSearch = max(HNSW_EF_SEARCH, k)
+            elif hasattr(self.index, 'nprobe'):
+                self.index.nprobe = IVFPQ_NPROBE
+            similarities, indices = self.index.search(_normalize(query_embedding), k)
+            similarities, indices = similarities[0], indices[0]
+            
+            # Apply the threshold in similarity space in one vectorized pass:
+            # relevance = (sim + 1) / 2 >= min_relevance. HNSW pads with -1
+            # when it finds fewer than k neighbours
+            keep = (indices >= 0) & (similarities >= 2 * min_relevance - 1)
+            
+            # FAISS returns neighbours best first, so no re-sort is needed
+            # tolist() yields plain Python floats/ints instead of numpy scalars
+            return [
+                (
+                    self.chunks[idx],
+                    self.metadata[idx],
+                    1 - sim,  # cosine distance
+                    (sim + 1) / 2  # cosine similarity mapped to [0, 1]
+                )
+                for sim, idx in zip(similarities[keep].tolist(), indices[keep].tolist())
+            ]
             
         except Exception as e:
             self.logger.error(f"Error searching: {str(e)}")
             return []
     
+    def save(self, path: str) -> bool:
+        """
+        Persist the FAISS index, embeddings and chunk metadata
+        
+        Args:
+            path: Directory to write into
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            import faiss
+            
+            if self.index is None:
+                return False
+            
+            if os.path.exists(os.path.join(path, INDEX_FILE)):
+                # Another session already persisted this document set
+                return True
+            
+            # Write into a sibling temp directory and rename it into place, so
+            # load() never sees an index without its matching chunk metadata
+            parent = os.path.dirname(os.path.abspath(path))
+            os.makedirs(parent, exist_ok=True)
+            tmp_path = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+            try:
+                faiss.write_index(self.index, os.path.join(tmp_path, INDEX_FILE))
+                np.save(os.path.join(tmp_path, EMBEDDINGS_FILE), self.embeddings)
+                with open(os.path.join(tmp_path, CHUNKS_FILE), 'wb') as f:
+                    pickle.dump(
+                        {'chunks': self.chunks, 'metadata': self.metadata}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL
+                    )
+                if os.path.isdir(path):
+                    # Leftover of an interrupted save without an index file
+                    shutil.rmtree(path)
+                os.replace(tmp_path, path)
+            except Exception:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+            
+            self.logger.info(f"Saved FAISS index with {self.index.ntotal} vectors to {path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error saving index: {str(e)}")
+            return False
+    
+    def load(self, path: str) -> bool:
+        """
+        Load a FAISS index, embeddings and chunk metadata written by save()
+        
+        Args:
+            path: Directory to read from
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        index_path = os.path.join(path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return False
+        
+        try:
+            import faiss
+            
+            # Memory-map where the index type supports it to avoid a RAM copy
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                index = faiss.read_index(index_path)
+            
+            with open(os.path.join(path, CHUNKS_FILE), 'rb') as f:
+                data = pickle.load(f)
+            embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+            
+            if index.ntotal != len(data['chunks']):
+                raise ValueError("Index and chunk metadata are out of sync")
+            if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+                raise ValueError("Index was built with an outdated metric")
+            
+            self.index = index
+            self.embeddings = embeddings
+            self.chunks = data['chunks']
+            self.metadata = data['metadata']
+            self.index_version += 1
+            
+            self.logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors from {path}")
+            return True
+            
+        except Exception as e:
+            self.logger.warning(f"Could not load index from {path}: {str(e)}")
+            return False
+    
     def get_stats(self) -> Dict:
         """Get statistics about the vector store"""
         return {
@@ -195,5 +563,6 @@ class EnhancedEmbedder:
         self.embeddings = []
         self.metadata = []
         self.index = None
+        self.index_version += 1
         self.logger.info("Embedder cleared")
 
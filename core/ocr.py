@@ -1,38 +1,133 @@
 """OCR module for extracting text from scanned PDFs"""
 
 import logging
-from typing import List, Dict, Optional
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Union
 from io import BytesIO
 import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rasterization resolution for OCR and for extracted page images; 200 DPI
+# is enough for Tesseract on body-size print at under half the pixels of 300
+OCR_DPI = 200
+IMAGE_DPI = 200
+
+# Per-thread in-process Tesseract handles (tesserocr's API is not thread-safe)
+_thread_state = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _ocr_dependencies_available() -> bool:
+    """Check once per process whether pytesseract and pdf2image can be imported"""
+    try:
+        import pytesseract
+        from pdf2image import convert_from_bytes
+        return True
+    except ImportError:
+        logger.warning("OCR dependencies not available. Install: pip install pytesseract pdf2image")
+        return False
+
+
+def _tesserocr_api():
+    """Return this thread's tesserocr API, or None when tesserocr is not installed"""
+    api = getattr(_thread_state, 'api', None)
+    if api is None:
+        try:
+            import tesserocr
+            api = tesserocr.PyTessBaseAPI(lang='eng')
+        except (ImportError, RuntimeError):
+            # RuntimeError: tesserocr is installed but cannot load its
+            # language data; fall back to pytesseract on this thread too
+            api = False
+        _thread_state.api = api
+    return api or None
+
+
+@lru_cache(maxsize=None)
+def _ocr_pool() -> ThreadPoolExecutor:
+    """Process-wide OCR threads, kept alive so each keeps its tesserocr API"""
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='ocr')
+
 
 class OCRProcessor:
     """Process scanned PDFs using OCR"""
     
-    def __init__(self):
+    def __init__(self, dpi: int = OCR_DPI):
+        """
+        Initialize the OCR processor
+        
+        Args:
+            dpi: Resolution pages are rendered at for OCR
+        """
         self.logger = logger
+        self.dpi = dpi
         self.ocr_available = self._check_ocr_availability()
     
     def _check_ocr_availability(self) -> bool:
         """Check if OCR dependencies are available"""
-        try:
-            import pytesseract
-            from pdf2image import convert_from_bytes
-            return True
-        except ImportError:
-            self.logger.warning("OCR dependencies not available. Install: pip install pytesseract pdf2image")
-            return False
+        return _ocr_dependencies_available()
     
-    def extract_text_with_ocr(self, file_bytes: bytes, filename: str) -> Dict:
+    def rasterize(
+        self,
+        file_bytes: Union[bytes, str],
+        dpi: Optional[int] = None,
+        output_folder: Optional[str] = None,
+        grayscale: bool = False,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None
+    ) -> List:
+        """
+        Render every PDF page to an image
+        
+        Args:
+            file_bytes: PDF file content as bytes, or path to a PDF file
+            dpi: Rendering resolution (default: the processor's OCR resolution)
+            output_folder: Optional directory to render into; pages are then
+                returned as PNG file paths instead of in-memory images
+            grayscale: Render single-channel images
+            first_page: Optional first 1-based page to render
+            last_page: Optional last 1-based page to render
+            
+        Returns:
+            List of PIL images (or file paths), one per page
+        """
+        from pdf2image import convert_from_bytes, convert_from_path
+        
+        # convert_from_bytes spools the PDF to a temporary file on every call;
+        # callers rendering several times pass a path to skip that
+        convert = convert_from_path if isinstance(file_bytes, str) else convert_from_bytes
+        options = {
+            'dpi': dpi or self.dpi,
+            'grayscale': grayscale,
+            'first_page': first_page,
+            'last_page': last_page,
+            'thread_count': os.cpu_count() or 1,
+        }
+        if output_folder:
+            return convert(
+                file_bytes, fmt='png', output_folder=output_folder, paths_only=True, **options
+            )
+        return convert(file_bytes, **options)
+    
+    def extract_text_with_ocr(
+        self,
+        file_bytes: Union[bytes, str],
+        filename: str,
+        images: Optional[List] = None
+    ) -> Dict:
         """
         Extract text from scanned PDF using OCR
         
         Args:
-            file_bytes: PDF file content as bytes
+            file_bytes: PDF file content as bytes, or path to a PDF file
             filename: Name of the PDF file
+            images: Optional page images from rasterize(), to avoid rendering again
             
         Returns:
             Dictionary with extracted text and metadata
@@ -46,41 +141,40 @@ class OCRProcessor:
             }
         
         try:
-            from pdf2image import convert_from_bytes
-            import pytesseract
-            
             self.logger.info(f"Starting OCR extraction for {filename}...")
             
-            # Convert PDF pages to images
-            images = convert_from_bytes(file_bytes, dpi=300)
+            if images is not None:
+                page_texts = self._ocr_pages(images)
+            else:
+                # Render pages to disk and hand Tesseract the file paths, so
+                # pages are never all held in memory (or re-encoded) at once
+                with tempfile.TemporaryDirectory() as output_folder:
+                    # Tesseract binarizes anyway; grayscale is a third of the pixels
+                    page_texts = self._ocr_pages(
+                        self.rasterize(file_bytes, output_folder=output_folder, grayscale=True)
+                    )
             
             extracted_pages = []
             full_text = []
             
-            for page_num, image in enumerate(images, 1):
-                try:
-                    # Perform OCR
-                    page_text = pytesseract.image_to_string(image, lang='eng')
-                    
-                    if page_text.strip():
-                        extracted_pages.append({
-                            'page': page_num,
-                            'text': page_text,
-                            'method': 'OCR'
-                        })
-                        full_text.append(f"\n--- Page {page_num} ---\n{page_text}")
-                    
-                    self.logger.info(f"OCR completed for page {page_num}/{len(images)}")
-                    
-                except Exception as e:
-                    self.logger.error(f"Error in OCR for page {page_num}: {str(e)}")
-                    continue
+            for page_num, page_text in enumerate(page_texts, 1):
+                if page_text and page_text.strip():
+                    extracted_pages.append({
+                        'page': page_num,
+                        'text': page_text,
+                        'method': 'OCR'
+                    })
+                    # Marker and page text go in as separate parts so the
+                    # page text is copied only once, by the final join
+                    if full_text:
+                        full_text.append('\n')
+                    full_text += (f"\n--- Page {page_num} ---\n", page_text)
             
             return {
                 'success': True,
-                'text': '\n'.join(full_text),
+                'text': ''.join(full_text),
                 'pages': extracted_pages,
-                'page_count': len(images),
+                'page_count': len(page_texts),
                 'method': 'OCR',
                 'error': None
             }
@@ -94,13 +188,122 @@ class OCRProcessor:
                 'error': str(e)
             }
     
-    def extract_images_from_pdf(self, file_bytes: bytes, filename: str) -> List[Dict]:
+    def extract_pages_with_ocr(
+        self,
+        file_bytes: Union[bytes, str],
+        filename: str,
+        pages: List[int],
+        images: Optional[List] = None
+    ) -> Dict[int, str]:
+        """
+        OCR selected pages of a PDF
+        
+        Args:
+            file_bytes: PDF file content as bytes, or path to a PDF file
+            filename: Name of the PDF file
+            pages: Sorted 1-based page numbers to OCR
+            images: Optional page images of the whole PDF from rasterize()
+            
+        Returns:
+            Dict mapping page number to OCR text (failed pages are left out)
+        """
+        if not self.ocr_available or not pages:
+            return {}
+        
+        try:
+            self.logger.info(f"Starting OCR of {len(pages)} pages of {filename}...")
+            
+            if images is not None:
+                page_texts = self._ocr_pages([images[page - 1] for page in pages], pages)
+            else:
+                # Render only the requested pages, one pdftoppm call per run
+                # of consecutive pages
+                runs = []
+                for page in pages:
+                    if runs and page == runs[-1][1] + 1:
+                        runs[-1][1] = page
+                    else:
+                        runs.append([page, page])
+                
+                with tempfile.TemporaryDirectory() as output_folder:
+                    paths = []
+                    for first_page, last_page in runs:
+                        paths.extend(self.rasterize(
+                            file_bytes, output_folder=output_folder, grayscale=True,
+                            first_page=first_page, last_page=last_page
+                        ))
+                    page_texts = self._ocr_pages(paths, pages)
+            
+            return {
+                page: page_text
+                for page, page_text in zip(pages, page_texts)
+                if page_text is not None
+            }
+            
+        except Exception as e:
+            self.logger.error(f"OCR extraction failed for {filename}: {str(e)}")
+            return {}
+    
+    def _ocr_pages(self, images: List, page_numbers: Optional[List[int]] = None) -> List[Optional[str]]:
+        """
+        Run Tesseract on page images concurrently
+        
+        Args:
+            images: PIL images or image file paths
+            page_numbers: Page number of each image (default: 1..len(images))
+            
+        Returns:
+            Page texts in input order (None where OCR failed)
+        """
+        if page_numbers is None:
+            page_numbers = range(1, len(images) + 1)
+        
+        # pytesseract runs one tesseract process per page, so a thread per
+        # core is enough to keep every core busy; map preserves page order
+        return list(_ocr_pool().map(self._ocr_page, images, page_numbers))
+    
+    def _ocr_page(self, image, page_num: int) -> Optional[str]:
+        """
+        Run Tesseract on one page image
+        
+        Args:
+            image: PIL image of the page, or path to an image file
+            page_num: 1-based page number (for logging)
+            
+        Returns:
+            Page text, or None if OCR failed
+        """
+        try:
+            api = _tesserocr_api()
+            if api is not None:
+                # In-process Tesseract: no subprocess or model reload per page
+                if isinstance(image, str):
+                    api.SetImageFile(image)
+                else:
+                    api.SetImage(image)
+                page_text = api.GetUTF8Text()
+            else:
+                import pytesseract
+                page_text = pytesseract.image_to_string(image, lang='eng')
+            self.logger.info(f"OCR completed for page {page_num}")
+            return page_text
+        except Exception as e:
+            self.logger.error(f"Error in OCR for page {page_num}: {str(e)}")
+            return None
+    
+    def extract_images_from_pdf(
+        self,
+        file_bytes: Union[bytes, str],
+        filename: str,
+        images: Optional[List] = None
+    ) -> List[Dict]:
         """
         Extract images from PDF for vision-based Q&A
         
         Args:
-            file_bytes: PDF file content as bytes
+            file_bytes: PDF file content as bytes, or path to a PDF file
             filename: Name of the PDF file
+            images: Optional page images from rasterize(), to avoid rendering again
             
         Returns:
             List of image dictionaries with page numbers
@@ -109,28 +312,22 @@ class OCRProcessor:
             return []
         
         try:
-            from pdf2image import convert_from_bytes
-            
             self.logger.info(f"Extracting images from {filename}...")
             
             # Convert PDF pages to images
-            images = convert_from_bytes(file_bytes, dpi=200)
+            if images is None:
+                images = self.rasterize(file_bytes, dpi=IMAGE_DPI)
             
-            image_list = []
-            
-            for page_num, image in enumerate(images, 1):
-                # Convert PIL image to bytes
-                from io import BytesIO
-                img_bytes = BytesIO()
-                image.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-                
-                image_list.append({
+            # PNG bytes are produced on demand with image_to_png; encoding every
+            # page up front cost more than rendering and nothing read them
+            image_list = [
+                {
                     'page': page_num,
                     'image': image,
-                    'image_bytes': img_bytes.getvalue(),
                     'filename': filename
-                })
+                }
+                for page_num, image in enumerate(images, 1)
+            ]
             
             self.logger.info(f"Extracted {len(image_list)} images from {filename}")
             return image_list
@@ -138,4 +335,18 @@ class OCRProcessor:
         except Exception as e:
             self.logger.error(f"Error extracting images: {str(e)}")
             return []
-
+    
+    @staticmethod
+    def image_to_png(image) -> bytes:
+        """
+        Encode a page image from extract_images_from_pdf as PNG
+        
+        Args:
+            image: PIL image
+            
+        Returns:
+            PNG file content (fast, lightly compressed)
+        """
+        img_bytes = BytesIO()
+        image.save(img_bytes, format='PNG', compress_level=1)
+        return img_bytes.getvalue()
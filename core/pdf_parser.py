@@ -1,11 +1,16 @@
 """Enhanced PDF Parser with OCR, table extraction, and image extraction"""
 
 import logging
-from typing import List, Dict, Optional, Tuple
+import multiprocessing
+import os
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterator, List, Dict, Optional, Tuple, Union
 import pdfplumber
 import PyPDF2
 from io import BytesIO
-import re
 
 from core.ocr import OCRProcessor
 from utils.helpers import clean_text, extract_page_number
@@ -13,6 +18,63 @@ from utils.helpers import clean_text, extract_page_number
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pages with fewer extracted characters than this are OCR candidates
+MIN_PAGE_TEXT = 50
+
+# Raw PDF bytes or a seekable binary file object (e.g. a Streamlit upload)
+PDFSource = Union[bytes, BinaryIO]
+
+
+def _process_pool_context():
+    """
+    Start method for extraction worker processes
+    
+    Forking a process that already runs threads (Streamlit's server, the
+    OCR pool) can copy held locks into the child and deadlock it, so workers
+    start from a fresh interpreter instead. The fork server preloads this
+    module rather than __main__, which under Streamlit is the app script.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['core.pdf_parser'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _extract_in_worker(file_bytes: bytes, filename: str, **options) -> Dict:
+    """Process pool entry point: extract one PDF with this process's parser"""
+    return get_default_parser().extract_from_pdf(file_bytes, filename, **options)
+
+
+def _as_stream(source: PDFSource) -> BinaryIO:
+    """Return a seekable stream over the PDF without copying file objects"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _as_bytes(source: PDFSource):
+    """Return the PDF content as a bytes-like object, zero-copy for BytesIO"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer()
+    source.seek(0)
+    return source.read()
+
+
+@contextmanager
+def _pdf_on_disk(source: PDFSource) -> Iterator[str]:
+    """Write the PDF to a temporary file for tools that read paths, and remove it afterwards"""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_as_bytes(source))
+        yield path
+    finally:
+        os.remove(path)
+
 
 class EnhancedPDFParser:
     """Enhanced PDF parser with multiple extraction methods"""
@@ -23,7 +85,7 @@ class EnhancedPDFParser:
     
     def extract_from_pdf(
         self,
-        file_bytes: bytes,
+        file_bytes: PDFSource,
         filename: str,
         use_ocr: bool = False,
         extract_tables: bool = True,
@@ -33,7 +95,7 @@ class EnhancedPDFParser:
         Extract text, tables, and images from PDF
         
         Args:
-            file_bytes: PDF file content as bytes
+            file_bytes: PDF content as bytes or a seekable binary file object
             filename: Name of the PDF file
             use_ocr: Whether to use OCR for scanned PDFs
             extract_tables: Whether to extract tables
@@ -51,39 +113,88 @@ class EnhancedPDFParser:
             'page_count': 0,
             'success': False,
             'method': 'pdfplumber',
-            'error': None
+            'error': None,
+            # OCR was requested and needed but did not (fully) run
+            'ocr_incomplete': False
         }
         
         try:
-            # First, try pdfplumber for high-quality text extraction
-            pdfplumber_result = self._extract_with_pdfplumber(
-                file_bytes, filename, extract_tables
-            )
+            # PyMuPDF is much faster when installed; pdfplumber is the fallback
+            text_result = self._extract_with_pymupdf(file_bytes, filename, extract_tables)
+            if text_result is None:
+                text_result = self._extract_with_pdfplumber(file_bytes, filename, extract_tables)
+            page_blocks = text_result.pop('page_blocks')
+            result.update(text_result)
             
-            # Check if we got sufficient text
-            text_length = len(pdfplumber_result.get('text', '').strip())
+            # OCR only pages where extraction found (almost) no text, so the
+            # born-digital pages of hybrid documents are never rasterized
+            thin_pages = [
+                block['page'] for block in page_blocks
+                if len(block['text'].strip()) < MIN_PAGE_TEXT
+            ]
+            # No page blocks at all means the text extractors could not open
+            # the file; OCR is then the only way to get at its text
+            needs_ocr = bool(use_ocr and (thin_pages or not page_blocks))
+            run_ocr = needs_ocr and self.ocr_processor.ocr_available
+            result['ocr_incomplete'] = needs_ocr and not run_ocr
             
-            if text_length < 50 and use_ocr:
-                # Try OCR if text extraction yielded little
-                self.logger.info(f"Insufficient text from pdfplumber for {filename}, trying OCR...")
-                ocr_result = self.ocr_processor.extract_text_with_ocr(file_bytes, filename)
-                
-                if ocr_result['success']:
-                    result.update(ocr_result)
-                    result['method'] = 'OCR'
-                else:
-                    # Use pdfplumber result even if minimal
-                    result.update(pdfplumber_result)
-            else:
-                result.update(pdfplumber_result)
-            
-            # Extract images if requested
-            if extract_images:
-                images = self.ocr_processor.extract_images_from_pdf(file_bytes, filename)
-                result['images'] = images
+            if run_ocr or extract_images:
+                # Poppler reads from a file: write the PDF once and render
+                # every OCR run and the page images from that same path
+                with _pdf_on_disk(file_bytes) as pdf_path:
+                    # Pages rendered for OCR are reused for image extraction
+                    page_images = None
+                    
+                    if run_ocr and extract_images:
+                        page_images = self.ocr_processor.rasterize(pdf_path)
+                    
+                    if run_ocr and not page_blocks:
+                        self.logger.info(f"No pages extracted from {filename}, trying OCR on the whole document...")
+                        ocr_result = self.ocr_processor.extract_text_with_ocr(
+                            pdf_path, filename, images=page_images
+                        )
+                        result['ocr_incomplete'] = not ocr_result['success']
+                        if ocr_result['success'] and ocr_result['text'].strip():
+                            result.update({
+                                'text': ocr_result['text'],
+                                'pages': ocr_result['pages'],
+                                'page_count': ocr_result['page_count'],
+                                'method': 'OCR',
+                                'error': None
+                            })
+                    elif run_ocr:
+                        self.logger.info(
+                            f"Insufficient text on {len(thin_pages)} pages of {filename}, trying OCR..."
+                        )
+                        ocr_texts = self.ocr_processor.extract_pages_with_ocr(
+                            pdf_path, filename, thin_pages, images=page_images
+                        )
+                        # Failed pages are left out of the OCR results
+                        result['ocr_incomplete'] = len(ocr_texts) < len(thin_pages)
+                        
+                        for block in page_blocks:
+                            ocr_text = ocr_texts.get(block['page'], '')
+                            if ocr_text.strip():
+                                block['text'] = ocr_text
+                                block['method'] = 'OCR'
+                        
+                        ocr_count = sum(block['method'] == 'OCR' for block in page_blocks)
+                        if ocr_count:
+                            result.update(self._join_page_blocks(page_blocks))
+                            result['method'] = (
+                                'OCR' if ocr_count == len(page_blocks) else f"{text_result['method']}+OCR"
+                            )
+                    
+                    # Extract images if requested
+                    if extract_images:
+                        result['images'] = self.ocr_processor.extract_images_from_pdf(
+                            pdf_path, filename, images=page_images
+                        )
             
-            # Process pages with metadata
-            result['pages'] = self._process_pages(result.get('text', ''), filename)
+            # Page entries come straight from extraction; no need to re-split
+            # the joined text on its page markers
+            for page in result['pages']:
+                page['filename'] = filename
             
             result['success'] = True
             result['text'] = clean_text(result.get('text', ''))
@@ -103,55 +214,44 @@ class EnhancedPDFParser:
     
     def _extract_with_pdfplumber(
         self,
-        file_bytes: bytes,
+        file_bytes: PDFSource,
         filename: str,
         extract_tables: bool = True
     ) -> Dict:
         """Extract text and tables using pdfplumber"""
         try:
-            text_content = []
             tables = []
-            pages_data = []
+            page_blocks = []
             
-            with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+            with pdfplumber.open(_as_stream(file_bytes)) as pdf:
                 for page_num, page in enumerate(pdf.pages, 1):
+                    # Text and table text of the page, kept apart so OCR can
+                    # replace the text of individual pages later
+                    block = {'page': page_num, 'text': '', 'method': 'pdfplumber', 'tables': []}
+                    page_blocks.append(block)
                     try:
                         # Extract text
-                        page_text = page.extract_text()
-                        
-                        if page_text:
-                            text_content.append(f"\n--- Page {page_num} ---\n{page_text}")
-                            pages_data.append({
-                                'page': page_num,
-                                'text': page_text,
-                                'method': 'pdfplumber'
-                            })
+                        block['text'] = page.extract_text() or ''
                         
                         # Extract tables if requested
                         if extract_tables:
                             page_tables = page.extract_tables()
                             for table_num, table in enumerate(page_tables, 1):
                                 if table:
-                                    # Convert table to text representation
-                                    table_text = self._table_to_text(table)
-                                    tables.append({
-                                        'page': page_num,
-                                        'table_num': table_num,
-                                        'data': table,
-                                        'text': table_text
-                                    })
-                                    # Add table text to page text
-                                    text_content.append(f"\n[Table {table_num} on Page {page_num}]\n{table_text}\n")
+                                    self._add_table(block, tables, table_num, table)
                     
                     except Exception as e:
                         self.logger.warning(f"Error extracting page {page_num}: {str(e)}")
                         continue
+                    finally:
+                        # pdfplumber keeps every parsed page's layout objects
+                        # alive with the document; drop them once we're done
+                        page.flush_cache()
             
             return {
-                'text': '\n'.join(text_content),
+                **self._join_page_blocks(page_blocks),
                 'tables': tables,
-                'pages': pages_data,
-                'page_count': len(pages_data),
+                'page_blocks': page_blocks,
                 'method': 'pdfplumber'
             }
             
@@ -161,93 +261,211 @@ class EnhancedPDFParser:
                 'text': '',
                 'tables': [],
                 'pages': [],
+                'page_blocks': [],
                 'page_count': 0,
                 'method': 'pdfplumber',
                 'error': str(e)
             }
     
-    def _table_to_text(self, table: List[List]) -> str:
-        """Convert table data to readable text"""
-        if not table:
-            return ""
+    def _extract_with_pymupdf(
+        self,
+        file_bytes: PDFSource,
+        filename: str,
+        extract_tables: bool = True
+    ) -> Optional[Dict]:
+        """
+        Extract text and tables using PyMuPDF
         
-        text_rows = []
-        for row in table:
-            # Filter out None values and join
-            clean_row = [str(cell) if cell is not None else '' for cell in row]
-            text_rows.append(' | '.join(clean_row))
+        Returns:
+            Same structure as _extract_with_pdfplumber, or None when PyMuPDF
+            is not installed or cannot open the file
+        """
+        try:
+            import pymupdf
+        except ImportError:
+            try:
+                # Module name used by PyMuPDF releases before 1.24.3
+                import fitz as pymupdf
+            except ImportError:
+                return None
         
-        return '\n'.join(text_rows)
+        try:
+            tables = []
+            page_blocks = []
+            
+            source = file_bytes if isinstance(file_bytes, (bytes, bytearray)) else _as_stream(file_bytes)
+            with pymupdf.open(stream=source, filetype='pdf') as doc:
+                for page_num, page in enumerate(doc, 1):
+                    block = {'page': page_num, 'text': '', 'method': 'pymupdf', 'tables': []}
+                    page_blocks.append(block)
+                    try:
+                        block['text'] = page.get_text('text') or ''
+                        
+                        # Table detection needs PyMuPDF 1.23+
+                        if extract_tables and hasattr(page, 'find_tables'):
+                            for table_num, table in enumerate(page.find_tables().tables, 1):
+                                data = table.extract()
+                                if data:
+                                    self._add_table(block, tables, table_num, data)
+                    
+                    except Exception as e:
+                        self.logger.warning(f"Error extracting page {page_num}: {str(e)}")
+                        continue
+            
+            return {
+                **self._join_page_blocks(page_blocks),
+                'tables': tables,
+                'page_blocks': page_blocks,
+                'method': 'pymupdf'
+            }
+            
+        except Exception as e:
+            self.logger.warning(f"PyMuPDF extraction failed for {filename}, falling back to pdfplumber: {str(e)}")
+            return None
     
-    def _process_pages(self, text: str, filename: str) -> List[Dict]:
-        """Process text and extract page-level metadata"""
-        pages = []
+    def _add_table(self, block: Dict, tables: List[Dict], table_num: int, table: List[List]):
+        """Record a table found on a page and its text representation"""
+        # Convert table to text representation
+        table_text = self._table_to_text(table)
+        tables.append({
+            'page': block['page'],
+            'table_num': table_num,
+            'data': table,
+            'text': table_text
+        })
+        block['tables'].append((table_num, table_text))
+    
+    def _join_page_blocks(self, page_blocks: List[Dict]) -> Dict:
+        """Assemble document text (with page markers and tables) from page blocks"""
+        text_content = []
+        pages_data = []
         
-        # Split by page markers
-        page_pattern = r'---\s*Page\s+(\d+)\s*---'
-        page_matches = list(re.finditer(page_pattern, text, re.IGNORECASE))
+        # Markers and page text go in as separate parts (with explicit '\n'
+        # separators) so page text is copied only once, by the final join
+        for block in page_blocks:
+            page_num = block['page']
+            if block['text']:
+                if text_content:
+                    text_content.append('\n')
+                text_content += (f"\n--- Page {page_num} ---\n", block['text'])
+                pages_data.append({
+                    'page': page_num,
+                    'text': block['text'],
+                    'method': block['method']
+                })
+            
+            # Add table text to page text
+            for table_num, table_text in block['tables']:
+                if text_content:
+                    text_content.append('\n')
+                text_content += (f"\n[Table {table_num} on Page {page_num}]\n", table_text, '\n')
         
-        for i, match in enumerate(page_matches):
-            page_num = int(match.group(1))
-            start_pos = match.end()
-            
-            # Find end position (next page marker or end of text)
-            if i + 1 < len(page_matches):
-                end_pos = page_matches[i + 1].start()
-            else:
-                end_pos = len(text)
-            
-            page_text = text[start_pos:end_pos].strip()
-            
-            pages.append({
-                'page': page_num,
-                'text': page_text,
-                'start_char': start_pos,
-                'end_char': end_pos,
-                'filename': filename
-            })
+        return {
+            'text': ''.join(text_content),
+            'pages': pages_data,
+            'page_count': len(pages_data)
+        }
+    
+    def _table_to_text(self, table: List[List]) -> str:
+        """Convert table data to readable text"""
+        if not table:
+            return ""
         
-        return pages
+        # Cells are usually already strings; only convert the rest (None -> '')
+        return '\n'.join(
+            ' | '.join(
+                cell if type(cell) is str else ('' if cell is None else str(cell))
+                for cell in row
+            )
+            for row in table
+        )
     
     def extract_from_multiple_pdfs(
         self,
-        files: List[Tuple[str, bytes]],
+        files: List[Tuple[str, PDFSource]],
         use_ocr: bool = False,
         extract_tables: bool = True,
-        extract_images: bool = False
+        extract_images: bool = False,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> List[Dict]:
         """
-        Extract content from multiple PDF files
+        Extract content from multiple PDF files in parallel
         
         Args:
-            files: List of tuples (filename, file_bytes)
+            files: List of tuples (filename, bytes or file object)
             use_ocr: Whether to use OCR
             extract_tables: Whether to extract tables
             extract_images: Whether to extract images
+            max_workers: Maximum worker processes (default: one per file, capped at CPU count)
+            progress_callback: Optional callback function(completed, total),
+                invoked from the calling thread
             
         Returns:
-            List of extraction results
+            List of extraction results, in the same order as `files`
         """
-        results = []
+        if not files:
+            return []
         
-        for filename, file_bytes in files:
-            result = self.extract_from_pdf(
-                file_bytes,
-                filename,
-                use_ocr=use_ocr,
-                extract_tables=extract_tables,
-                extract_images=extract_images
-            )
-            results.append(result)
-            
-            if result['success']:
-                self.logger.info(
-                    f"Successfully extracted from {filename}: "
-                    f"{len(result['text'])} chars, "
-                    f"{len(result['tables'])} tables"
-                )
-            else:
-                self.logger.error(f"Failed to extract from {filename}: {result.get('error', 'Unknown error')}")
+        total = len(files)
+        if max_workers is None:
+            max_workers = min(total, os.cpu_count() or 1)
+        
+        results: List[Optional[Dict]] = [None] * total
+        
+        # pdfminer is pure Python and holds the GIL, so spread several files
+        # across processes; a single file stays on a thread
+        use_processes = total > 1 and max_workers > 1
+        executor = (
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_pool_context())
+            if use_processes else ThreadPoolExecutor(max_workers=max_workers)
+        )
+        
+        with executor:
+            futures = {
+                executor.submit(
+                    # Workers use their own parser instead of unpickling this one
+                    _extract_in_worker if use_processes else self.extract_from_pdf,
+                    # File objects don't cross process boundaries
+                    bytes(_as_bytes(file_bytes)) if use_processes else file_bytes,
+                    filename,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_images=extract_images
+                ): i
+                for i, (filename, file_bytes) in enumerate(files)
+            }
+            
+            for completed, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                result = future.result()
+                results[i] = result
+                filename = files[i][0]
+                
+                if result['success']:
+                    self.logger.info(
+                        f"Successfully extracted from {filename}: "
+                        f"{len(result['text'])} chars, "
+                        f"{len(result['tables'])} tables"
+                    )
+                else:
+                    self.logger.error(f"Failed to extract from {filename}: {result.get('error', 'Unknown error')}")
+                
+                if progress_callback:
+                    progress_callback(completed, total)
         
         return results
 
+
+@lru_cache(maxsize=None)
+def get_default_parser() -> EnhancedPDFParser:
+    """
+    Return a parser shared by all callers in this process
+    
+    The parser holds no per-document state, so there is no need to build
+    one (and re-check OCR support) for every request.
+    
+    Returns:
+        Shared EnhancedPDFParser instance
+    """
+    return EnhancedPDFParser()
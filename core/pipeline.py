@@ -0,0 +1,177 @@
+"""Pipelined extraction, chunking and embedding of PDF documents"""
+
+import logging
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.cache import ProcessingCache
+from core.embedder import EnhancedEmbedder, EMBEDDING_DIM
+from core.pdf_parser import (
+    EnhancedPDFParser, PDFSource, _as_bytes, _extract_in_worker, _process_pool_context
+)
+from utils.helpers import chunk_text_by_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stages each document passes through, used for progress reporting
+PIPELINE_STAGES = 3
+
+
+class DocumentPipeline:
+    """Overlap extraction, chunking and embedding across PDFs"""
+    
+    def __init__(
+        self,
+        parser: EnhancedPDFParser,
+        embedder: EnhancedEmbedder,
+        chunk_size: int = 600,
+        overlap: int = 100,
+        max_workers: Optional[int] = None,
+        cache: Optional[ProcessingCache] = None
+    ):
+        """
+        Initialize the pipeline
+        
+        Args:
+            parser: Parser used for extraction
+            embedder: Embedder used for embedding (its index is not touched)
+            chunk_size: Target chunk size in tokens
+            overlap: Overlap in tokens between chunks
+            max_workers: Workers per stage (default: CPU count)
+            cache: Optional cache used to reuse extraction results
+        """
+        self.parser = parser
+        self.embedder = embedder
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.logger = logger
+    
+    def run(
+        self,
+        files: List[Tuple[str, PDFSource]],
+        use_ocr: bool = False,
+        extract_tables: bool = True,
+        extract_images: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
+        """
+        Process PDFs so that each stage starts as soon as its input is ready
+        
+        A document is chunked as soon as it is extracted and embedded as soon
+        as it is chunked, while other documents are still being parsed.
+        
+        Args:
+            files: List of tuples (filename, bytes or file object)
+            use_ocr: Whether to use OCR
+            extract_tables: Whether to extract tables
+            extract_images: Whether to extract images
+            progress_callback: Optional callback function(completed, total),
+                invoked from the calling thread
+                
+        Returns:
+            One dict per file, in input order, with 'result' (extraction
+            result), 'chunks' and 'embeddings' (empty when extraction failed)
+        """
+        outputs = [
+            {'result': None, 'chunks': [], 'embeddings': np.empty((0, EMBEDDING_DIM), dtype=np.float32)}
+            for _ in files
+        ]
+        if not files:
+            return outputs
+            
+        total = PIPELINE_STAGES * len(files)
+        completed = 0
+        workers = min(len(files), self.max_workers)
+        
+        options = {
+            'use_ocr': use_ocr,
+            'extract_tables': extract_tables,
+            'extract_images': extract_images,
+        }
+        extraction_keys = [
+            self.cache.make_key(source, filename, **options) if self.cache else None
+            for filename, source in files
+        ]
+        
+        # Parsing and chunking are pure Python and hold the GIL: use processes
+        # when there is more than one document to spread across cores,
+        # otherwise skip the start-up cost
+        use_processes = len(files) > 1
+        cpu_pool = (
+            ProcessPoolExecutor(max_workers=workers, mp_context=_process_pool_context())
+            if use_processes else ThreadPoolExecutor(max_workers=workers)
+        )
+        
+        with cpu_pool, \
+                ThreadPoolExecutor(max_workers=workers) as embed_pool:
+            pending = {}
+            cached = set()
+            for i, (filename, source) in enumerate(files):
+                result = self.cache.load_extraction(extraction_keys[i]) if self.cache else None
+                if result is not None:
+                    cached.add(i)
+                    future = Future()
+                    future.set_result(result)
+                else:
+                    future = cpu_pool.submit(
+                        # Workers use their own parser instead of unpickling this one
+                        _extract_in_worker if use_processes else self.parser.extract_from_pdf,
+                        # File objects don't cross process boundaries
+                        bytes(_as_bytes(source)) if use_processes else source,
+                        filename,
+                        **options
+                    )
+                pending[future] = ('extract', i)
+            
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, i = pending.pop(future)
+                    completed += 1
+                    
+                    if stage == 'extract':
+                        result = future.result()
+                        outputs[i]['result'] = result
+                        if result['success']:
+                            # Retry OCR on the next upload instead of keeping
+                            # text extracted without it
+                            if self.cache and i not in cached and not result.get('ocr_incomplete'):
+                                self.cache.save_extraction(extraction_keys[i], result)
+                            pending[cpu_pool.submit(
+                                chunk_text_by_tokens,
+                                result.get('text', ''),
+                                self.chunk_size,
+                                self.overlap,
+                                {'filename': result['filename']}
+                            )] = ('chunk', i)
+                        else:
+                            self.logger.error(
+                                f"Failed to extract from {files[i][0]}: {result.get('error', 'Unknown error')}"
+                            )
+                            # Nothing left to do for this document
+                            completed += PIPELINE_STAGES - 1
+                            
+                    elif stage == 'chunk':
+                        chunks = future.result()
+                        outputs[i]['chunks'] = chunks
+                        pending[embed_pool.submit(
+                            self.embedder.embed_texts,
+                            [c['text'] for c in chunks]
+                        )] = ('embed', i)
+                        
+                    else:
+                        outputs[i]['embeddings'] = future.result()
+                        
+                    if progress_callback:
+                        progress_callback(completed, total)
+                        
+        return outputs
+
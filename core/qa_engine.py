@@ -1,12 +1,73 @@
 """Enhanced QA Engine with streaming support"""
 
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional, Iterator
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Transient failures worth retrying; bad requests, auth and missing-model
+# errors fail the same way every time and are raised at once
+RETRYABLE_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Network/API failures that interrupt a stream and are answered with a
+# non-streaming request instead
+STREAM_FALLBACK_ERRORS = (google_exceptions.GoogleAPIError, ConnectionError, TimeoutError)
+
+# Attempts and base delay (seconds, doubled per retry) for transient failures
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+
+# Gemini requests run concurrently per engine (network-bound, GIL-friendly)
+GENERATION_WORKERS = 8
+
+# Fixed parts of every QA prompt
+SYSTEM_PROMPT = (
+    "You are a helpful AI assistant that answers questions based on provided PDF documents. "
+    "Provide accurate, clear, and concise answers based ONLY on the context below. "
+    "If the answer cannot be found in the context, clearly state that."
+)
+ANSWER_INSTRUCTIONS = (
+    "\n### Instructions:"
+    "\n1. Answer based on the context provided."
+    "\n2. Be specific and cite sources when possible."
+    "\n3. If information is not in the context, say so clearly."
+    "\n4. Keep your answer clear, concise, and well-structured."
+    "\n5. Mention source document and page number when relevant."
+)
+CONTINUATION_INSTRUCTION = (
+    "6. The answer below was cut off. Continue it exactly where it stops, "
+    "without repeating any of it."
+)
+
+# Maximum characters of source text sent in a summary prompt
+SUMMARY_CHAR_LIMIT = 8000
+
+# Summary prompt per summary type
+SUMMARY_PROMPTS = {
+    "full": "Provide a comprehensive summary of the following text:",
+    "key_points": "Extract and list the key points from the following text:",
+    "glossary": "Create a glossary of important terms and their definitions from the following text:",
+}
+DEFAULT_SUMMARY_PROMPT = "Summarize the following text:"
+
+# Sentinel marking the end of a background token stream
+_STREAM_END = object()
+
 
 class EnhancedQAEngine:
     """Enhanced QA Engine with streaming and better context handling"""
@@ -44,6 +105,11 @@ class EnhancedQAEngine:
             {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
         ]
+        
+        # Bounded pool for blocking generate_content calls
+        self._executor = ThreadPoolExecutor(
+            max_workers=GENERATION_WORKERS, thread_name_prefix="gemini"
+        )
     
     def answer_question(
         self,
@@ -51,7 +117,8 @@ class EnhancedQAEngine:
         context: str,
         sources: List[Dict],
         chat_history: Optional[List[Dict]] = None,
-        stream: bool = False
+        stream: bool = False,
+        partial_answer: Optional[str] = None
     ) -> Dict:
         """
         Answer question with context (non-streaming)
@@ -62,20 +129,17 @@ class EnhancedQAEngine:
             sources: Source list
             chat_history: Previous conversation
             stream: Whether to stream (for streaming, use answer_question_stream)
+            partial_answer: Start of an interrupted answer; only the rest is generated
             
         Returns:
             Dictionary with answer and metadata
         """
         try:
-            prompt = self._create_prompt(question, context, chat_history)
+            prompt = self._create_prompt(question, context, chat_history, partial_answer)
             
             self.logger.info(f"Generating answer for: {question[:50]}...")
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
-            )
+            response = self._generate_with_retry(prompt)
             
             answer = response.text if response.text else "I couldn't generate an answer."
             
@@ -99,6 +163,42 @@ class EnhancedQAEngine:
                 'error': str(e)
             }
     
+    def answer_question_async(self, *args, **kwargs) -> Future:
+        """
+        Run answer_question on the engine's thread pool
+        
+        Args:
+            *args, **kwargs: Arguments for answer_question
+            
+        Returns:
+            Future resolving to the answer_question result dict
+        """
+        return self._executor.submit(self.answer_question, *args, **kwargs)
+    
+    def _generate_with_retry(self, prompt: str):
+        """
+        Call the model, retrying transient failures with exponential backoff
+        
+        Args:
+            prompt: Prompt to send
+            
+        Returns:
+            Model response
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return self.model.generate_content(
+                    prompt,
+                    generation_config=self.generation_config,
+                    safety_settings=self.safety_settings
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = RETRY_BACKOFF * 2 ** attempt
+                self.logger.warning(f"Generation failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
     def answer_question_stream(
         self,
         question: str,
@@ -117,6 +217,10 @@ class EnhancedQAEngine:
             
         Yields:
             Token chunks as they are generated
+            
+        Raises:
+            Any error from the model, so a failed answer is never mistaken
+            for a complete one
         """
         try:
             prompt = self._create_prompt(question, context, chat_history)
@@ -133,9 +237,59 @@ class EnhancedQAEngine:
                 if chunk.text:
                     yield chunk.text
                     
+        except STREAM_FALLBACK_ERRORS as e:
+            # Let the caller fall back to a non-streaming request
+            self.logger.warning(f"Streaming interrupted: {str(e)}")
+            raise
         except Exception as e:
             self.logger.error(f"Error in streaming: {str(e)}")
-            yield f"Error: {str(e)}"
+            raise
+    
+    def answer_question_stream_background(
+        self,
+        question: str,
+        context: str,
+        sources: List[Dict],
+        chat_history: Optional[List[Dict]] = None
+    ) -> Iterator[str]:
+        """
+        Stream answer tokens produced by a background thread
+        
+        The network stream is drained on a worker thread into a queue, so
+        reading from Gemini overlaps with the caller rendering earlier tokens.
+        
+        Args:
+            question: User question
+            context: Retrieved context
+            sources: Source list
+            chat_history: Previous conversation
+            
+        Yields:
+            Token chunks as they are generated
+            
+        Raises:
+            Any error raised by the stream, in the calling thread
+        """
+        tokens: queue.Queue = queue.Queue()
+        
+        def produce():
+            try:
+                for token in self.answer_question_stream(question, context, sources, chat_history):
+                    tokens.put(token)
+            except BaseException as e:
+                tokens.put(e)
+            finally:
+                tokens.put(_STREAM_END)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        
+        while True:
+            token = tokens.get()
+            if token is _STREAM_END:
+                return
+            if isinstance(token, BaseException):
+                raise token
+            yield token
     
     def summarize(
         self,
@@ -153,14 +307,10 @@ class EnhancedQAEngine:
             Summary text
         """
         try:
-            if summary_type == "full":
-                prompt = f"Provide a comprehensive summary of the following text:\n\n{text[:8000]}"
-            elif summary_type == "key_points":
-                prompt = f"Extract and list the key points from the following text:\n\n{text[:8000]}"
-            elif summary_type == "glossary":
-                prompt = f"Create a glossary of important terms and their definitions from the following text:\n\n{text[:8000]}"
-            else:
-                prompt = f"Summarize the following text:\n\n{text[:8000]}"
+            instruction = SUMMARY_PROMPTS.get(summary_type, DEFAULT_SUMMARY_PROMPT)
+            if len(text) > SUMMARY_CHAR_LIMIT:
+                text = text[:SUMMARY_CHAR_LIMIT]
+            prompt = f"{instruction}\n\n{text}"
             
             response = self.model.generate_content(
                 prompt,
@@ -174,6 +324,25 @@ class EnhancedQAEngine:
             self.logger.error(f"Error generating summary: {str(e)}")
             return f"Error: {str(e)}"
     
+    def summarize_many(
+        self,
+        texts: List[str],
+        summary_type: str = "full"
+    ) -> List[str]:
+        """
+        Summarize several texts concurrently
+        
+        Args:
+            texts: Texts to summarize
+            summary_type: Type of summary (full, key_points, glossary)
+            
+        Returns:
+            Summaries in the same order as `texts`
+        """
+        return list(self._executor.map(
+            lambda text: self.summarize(text, summary_type=summary_type), texts
+        ))
+    
     def summarize_pages(
         self,
         pages: List[Dict],
@@ -190,11 +359,19 @@ class EnhancedQAEngine:
             Summary text
         """
         try:
-            # Extract text from selected pages
+            # Extract text from selected pages, in page order, stopping once
+            # the summary prompt cannot take any more text
+            pages_by_num = {page.get('page'): page for page in pages}
             selected_text = []
-            for page in pages:
-                if page.get('page') in page_numbers:
-                    selected_text.append(f"Page {page['page']}:\n{page.get('text', '')}")
+            length = 0
+            for page_num in sorted(set(page_numbers)):
+                page = pages_by_num.get(page_num)
+                if page is None:
+                    continue
+                selected_text.append(f"Page {page_num}:\n{page.get('text', '')}")
+                length += len(selected_text[-1]) + 2
+                if length >= SUMMARY_CHAR_LIMIT:
+                    break
             
             combined_text = "\n\n".join(selected_text)
             
@@ -211,17 +388,11 @@ class EnhancedQAEngine:
         self,
         question: str,
         context: str,
-        chat_history: Optional[List[Dict]] = None
+        chat_history: Optional[List[Dict]] = None,
+        partial_answer: Optional[str] = None
     ) -> str:
         """Create prompt for the model"""
-        prompt_parts = []
-        
-        # System instruction
-        prompt_parts.append(
-            "You are a helpful AI assistant that answers questions based on provided PDF documents. "
-            "Provide accurate, clear, and concise answers based ONLY on the context below. "
-            "If the answer cannot be found in the context, clearly state that."
-        )
+        prompt_parts = [SYSTEM_PROMPT]
         
         # Add chat history (last 5-10 turns)
         if chat_history:
@@ -234,25 +405,17 @@ class EnhancedQAEngine:
                 elif role == 'assistant':
                     prompt_parts.append(f"Assistant: {content}")
         
-        # Add context
-        prompt_parts.append("\n### Context from PDF Documents:")
-        prompt_parts.append(context)
-        
-        # Add current question
-        prompt_parts.append("\n### Current Question:")
-        prompt_parts.append(question)
-        
-        # Instructions
-        prompt_parts.append(
-            "\n### Instructions:"
-            "\n1. Answer based on the context provided."
-            "\n2. Be specific and cite sources when possible."
-            "\n3. If information is not in the context, say so clearly."
-            "\n4. Keep your answer clear, concise, and well-structured."
-            "\n5. Mention source document and page number when relevant."
+        # Add context and the current question
+        prompt_parts += (
+            "\n### Context from PDF Documents:", context,
+            "\n### Current Question:", question,
+            ANSWER_INSTRUCTIONS,
         )
         
-        prompt_parts.append("\n### Answer:")
+        if partial_answer:
+            prompt_parts += (CONTINUATION_INSTRUCTION, "\n### Answer:", partial_answer)
+        else:
+            prompt_parts.append("\n### Answer:")
         
         return "\n".join(prompt_parts)
     
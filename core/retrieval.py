@@ -1,6 +1,8 @@
 """Retrieval module for semantic search and chunk retrieval"""
 
 import logging
+from collections import OrderedDict
+import numpy as np
 from typing import List, Dict, Tuple, Optional
 from core.embedder import EnhancedEmbedder
 from utils.helpers import calculate_relevance_score, format_citation, highlight_text
@@ -8,6 +10,9 @@ from utils.helpers import calculate_relevance_score, format_citation, highlight_
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of retrieve() results kept per engine
+RETRIEVAL_CACHE_SIZE = 256
+
 
 class RetrievalEngine:
     """Retrieval engine for finding relevant chunks"""
@@ -21,12 +26,15 @@ class RetrievalEngine:
         """
         self.embedder = embedder
         self.logger = logger
+        # LRU of (query, top_k, min_relevance, index version) -> sources
+        self._cache: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
     
     def retrieve(
         self,
         query: str,
         top_k: int = 5,
-        min_relevance: float = 0.3
+        min_relevance: float = 0.3,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Retrieve relevant chunks for a query
@@ -35,13 +43,27 @@ class RetrievalEngine:
             query: Search query
             top_k: Number of results to return
             min_relevance: Minimum relevance score threshold
+            query_embedding: Optional precomputed embedding of `query`
             
         Returns:
             List of source dictionaries with full metadata
         """
+        # Repeated questions (retries, regenerations) reuse earlier results
+        # until the embedder's index changes
+        cache_key = (query, top_k, min_relevance, self.embedder.index_version)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return list(cached)
+        
         try:
-            # Search using embedder
-            results = self.embedder.search(query, top_k=top_k, min_relevance=min_relevance)
+            # Search using embedder, skipping the embedding call when possible
+            if query_embedding is not None:
+                results = self.embedder.search_by_vector(
+                    query_embedding, top_k=top_k, min_relevance=min_relevance
+                )
+            else:
+                results = self.embedder.search(query, top_k=top_k, min_relevance=min_relevance)
             
             # Format results
             sources = []
@@ -58,12 +80,19 @@ class RetrievalEngine:
                     'page': metadata.get('page', metadata.get('page_num', 0)),
                     'chunk_id': metadata.get('chunk_id', i),
                     'citation': format_citation(metadata),
-                    **metadata
+                    # Shared with the embedder rather than copied per result
+                    'metadata': metadata
                 }
                 sources.append(source)
             
             self.logger.info(f"Retrieved {len(sources)} sources for query: {query[:50]}...")
-            return sources
+            
+            # Empty results may come from a failed API call; don't keep them
+            if sources:
+                self._cache[cache_key] = sources
+                if len(self._cache) > RETRIEVAL_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            return list(sources)
             
         except Exception as e:
             self.logger.error(f"Error in retrieval: {str(e)}")
@@ -72,7 +101,8 @@ class RetrievalEngine:
     def get_context_for_qa(
         self,
         query: str,
-        top_k: int = 3
+        top_k: int = 3,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Tuple[str, List[Dict]]:
         """
         Get formatted context for QA
@@ -80,12 +110,16 @@ class RetrievalEngine:
         Args:
             query: User question
             top_k: Number of chunks to retrieve
+            query_embedding: Optional precomputed embedding of `query`
             
         Returns:
             Tuple of (formatted_context, sources_list)
         """
-        sources = self.retrieve(query, top_k=top_k)
-        
+        sources = self.retrieve(query, top_k=top_k, query_embedding=query_embedding)
+        return self._format_context(sources)
+    
+    def _format_context(self, sources: List[Dict]) -> Tuple[str, List[Dict]]:
+        """Format retrieved sources as QA context with source markers"""
         if not sources:
             return "No relevant context found.", []
         
@@ -102,6 +136,54 @@ class RetrievalEngine:
         formatted_context = "\n".join(context_parts)
         return formatted_context, sources
     
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        min_relevance: float = 0.3
+    ) -> List[List[Dict]]:
+        """
+        Retrieve relevant chunks for several queries with one embedding request
+        
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            min_relevance: Minimum relevance score threshold
+            
+        Returns:
+            One list of source dictionaries per query
+        """
+        try:
+            query_embeddings = self.embedder.embed_queries(queries)
+        except Exception as e:
+            self.logger.error(f"Error embedding queries: {str(e)}")
+            return [[] for _ in queries]
+        
+        return [
+            self.retrieve(query, top_k=top_k, min_relevance=min_relevance, query_embedding=embedding[None, :])
+            for query, embedding in zip(queries, query_embeddings)
+        ]
+    
+    def get_context_for_qa_many(
+        self,
+        queries: List[str],
+        top_k: int = 3
+    ) -> List[Tuple[str, List[Dict]]]:
+        """
+        Get formatted context for several questions
+        
+        Args:
+            queries: User questions
+            top_k: Number of chunks to retrieve per question
+            
+        Returns:
+            One (formatted_context, sources_list) tuple per question
+        """
+        return [
+            self._format_context(sources)
+            for sources in self.retrieve_many(queries, top_k=top_k)
+        ]
+    
     def get_stats(self) -> Dict:
         """Get retrieval statistics"""
         return self.embedder.get_stats()
@@ -1,38 +1,33 @@
 """Premium UI Components for PDF Q&A Bot with Glassmorphism Design"""
 
+import hashlib
+import html
+import re
+import time
 import streamlit as st
+from functools import lru_cache
 from typing import List, Dict, Optional
-import time
 
+# Chat bubbles kept built across reruns; the whole history is redrawn each time
+MESSAGE_CACHE_SIZE = 256
 
-def get_premium_css(theme: str = "light") -> str:
-    """
-    Get premium CSS with glassmorphism, gradients, and animations
-    
-    Args:
-        theme: 'light' or 'dark'
-        
-    Returns:
-        CSS string
-    """
-    if theme == "dark":
-        return """
+# Minimum seconds between repaints of a streaming message
+STREAMING_REFRESH_INTERVAL = 0.05
+
+# Number of most recent messages listed in the sidebar history panel
+HISTORY_PANEL_SIZE = 10
+
+# Google Fonts as <link> tags: unlike @import in the stylesheet, they don't
+# hold up parsing the rest of the CSS while the font CSS is fetched
+_FONT_LINKS = (
+    '<link rel="preconnect" href="https://fonts.googleapis.com">'
+    '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+    '<link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">'
+)
+
+# Rules shared by both themes; what differs is set through the :root variables
+_CSS_BASE = """
         <style>
-            /* Import Google Fonts */
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-            
-            /* Root Variables */
-            :root {
-                --bg-primary: #0D0F16;
-                --bg-secondary: rgba(255, 255, 255, 0.05);
-                --bg-glass: rgba(255, 255, 255, 0.08);
-                --text-primary: #ECECEC;
-                --text-secondary: rgba(236, 236, 236, 0.7);
-                --gradient-primary: linear-gradient(135deg, #6A5CFF 0%, #AD7BFF 100%);
-                --gradient-accent: linear-gradient(135deg, #39F3C7 0%, #6A5CFF 100%);
-                --glow-primary: rgba(147, 102, 255, 0.25);
-                --shadow-soft: rgba(0, 0, 0, 0.3);
-            }
             
             /* Global Styles */
             * {
@@ -42,8 +37,8 @@ def get_premium_css(theme: str = "light") -> str:
             .stApp {
                 background: var(--bg-primary);
                 background-image: 
-                    radial-gradient(at 20% 30%, rgba(106, 92, 255, 0.15) 0px, transparent 50%),
-                    radial-gradient(at 80% 70%, rgba(173, 123, 255, 0.15) 0px, transparent 50%);
+                    radial-gradient(at 20% 30%, var(--glow-violet) 0px, transparent 50%),
+                    radial-gradient(at 80% 70%, var(--glow-lilac) 0px, transparent 50%);
             }
             
             /* Premium Header */
@@ -51,13 +46,13 @@ def get_premium_css(theme: str = "light") -> str:
                 font-size: 3.5rem;
                 font-weight: 800;
                 background: var(--gradient-primary);
-                -webkit-background-clip: text;
+                /* No unprefixed equivalent; unlike color, it also wins over
+                   the dark theme's !important markdown text colour */
                 -webkit-text-fill-color: transparent;
                 background-clip: text;
                 text-align: center;
                 margin: 2rem 0 0.5rem 0;
                 letter-spacing: -0.02em;
-                animation: fadeInDown 0.6s ease-out;
             }
             
             .premium-subheader {
@@ -66,29 +61,42 @@ def get_premium_css(theme: str = "light") -> str:
                 text-align: center;
                 margin-bottom: 3rem;
                 font-weight: 400;
-                animation: fadeInUp 0.6s ease-out 0.2s both;
             }
             
             /* Glass Cards */
             .glass-card {
                 background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
-                -webkit-backdrop-filter: blur(20px) saturate(180%);
                 border-radius: 20px;
-                border: 1px solid rgba(255, 255, 255, 0.1);
+                border: 1px solid var(--border-glass);
                 padding: 1.5rem;
                 margin: 1rem 0;
                 box-shadow: 0 8px 32px var(--shadow-soft);
-                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                animation: fadeIn 0.5s ease-out;
+                position: relative;
+                transition: transform 0.3s cubic-bezier(0.4, 0, 0.2, 1), border-color 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+            }
+            
+            /* The hover shadow is pre-rendered and faded in: animating
+               opacity stays on the compositor, animating box-shadow repaints */
+            .glass-card::after {
+                content: "";
+                position: absolute;
+                inset: 0;
+                border-radius: inherit;
+                box-shadow: 0 12px 40px var(--shadow-soft);
+                opacity: 0;
+                transition: opacity 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+                pointer-events: none;
             }
             
             .glass-card:hover {
                 transform: translateY(-2px);
-                box-shadow: 0 12px 40px var(--shadow-soft);
                 border-color: rgba(106, 92, 255, 0.3);
             }
             
+            .glass-card:hover::after {
+                opacity: 1;
+            }
+            
             /* Chat Bubbles */
             .chat-bubble-user {
                 background: var(--gradient-primary);
@@ -99,22 +107,19 @@ def get_premium_css(theme: str = "light") -> str:
                 max-width: 75%;
                 margin-left: auto;
                 box-shadow: 0 4px 20px var(--glow-primary);
-                animation: slideInRight 0.4s cubic-bezier(0.4, 0, 0.2, 1);
                 font-weight: 400;
                 line-height: 1.6;
             }
             
             .chat-bubble-assistant {
                 background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
                 color: var(--text-primary);
                 padding: 1rem 1.5rem;
                 border-radius: 20px 20px 20px 4px;
                 margin: 1rem 0;
                 max-width: 75%;
-                border: 1px solid rgba(255, 255, 255, 0.1);
+                border: 1px solid var(--border-bubble);
                 box-shadow: 0 4px 20px var(--shadow-soft);
-                animation: slideInLeft 0.4s cubic-bezier(0.4, 0, 0.2, 1);
                 font-weight: 400;
                 line-height: 1.6;
             }
@@ -129,7 +134,7 @@ def get_premium_css(theme: str = "light") -> str:
                 font-weight: 600;
                 font-size: 0.95rem;
                 cursor: pointer;
-                transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
+                transition: transform 0.2s cubic-bezier(0.4, 0, 0.2, 1), box-shadow 0.2s cubic-bezier(0.4, 0, 0.2, 1);
                 box-shadow: 0 4px 15px var(--glow-primary);
                 position: relative;
                 overflow: hidden;
@@ -147,20 +152,33 @@ def get_premium_css(theme: str = "light") -> str:
             /* Citation Cards */
             .citation-card {
                 background: var(--bg-glass);
-                backdrop-filter: blur(15px) saturate(180%);
                 border-radius: 16px;
                 padding: 1.25rem;
                 margin: 0.75rem 0;
-                border: 1px solid rgba(255, 255, 255, 0.1);
+                border: 1px solid var(--border-glass);
                 box-shadow: 0 4px 16px var(--shadow-soft);
-                transition: all 0.3s ease;
-                animation: fadeInUp 0.4s ease-out;
+                position: relative;
+                transition: transform 0.3s ease, border-color 0.3s ease;
+            }
+            
+            .citation-card::after {
+                content: "";
+                position: absolute;
+                inset: 0;
+                border-radius: inherit;
+                box-shadow: 0 6px 24px var(--shadow-soft);
+                opacity: 0;
+                transition: opacity 0.3s ease;
+                pointer-events: none;
             }
             
             .citation-card:hover {
                 transform: translateY(-2px);
                 border-color: rgba(106, 92, 255, 0.3);
-                box-shadow: 0 6px 24px var(--shadow-soft);
+            }
+            
+            .citation-card:hover::after {
+                opacity: 1;
             }
             
             .page-badge {
@@ -194,27 +212,21 @@ def get_premium_css(theme: str = "light") -> str:
             /* Upload Zone */
             .upload-zone {
                 background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
                 border: 2px dashed rgba(106, 92, 255, 0.4);
                 border-radius: 20px;
                 padding: 3rem 2rem;
                 text-align: center;
-                transition: all 0.3s ease;
+                transition: transform 0.3s ease, border-color 0.3s ease, background-color 0.3s ease;
                 cursor: pointer;
             }
             
             .upload-zone:hover {
                 border-color: rgba(106, 92, 255, 0.7);
-                background: rgba(106, 92, 255, 0.1);
+                background-color: rgba(106, 92, 255, 0.1);
                 transform: scale(1.02);
             }
             
             /* Animations */
-            @keyframes fadeIn {
-                from { opacity: 0; }
-                to { opacity: 1; }
-            }
-            
             @keyframes fadeInDown {
                 from {
                     opacity: 0;
@@ -237,48 +249,89 @@ def get_premium_css(theme: str = "light") -> str:
                 }
             }
             
-            @keyframes slideInRight {
-                from {
-                    opacity: 0;
-                    transform: translateX(30px) scale(0.95);
-                }
-                to {
-                    opacity: 1;
-                    transform: translateX(0) scale(1);
-                }
+            /* Sidebar Styling */
+            [data-testid="stSidebar"] {
+                background: var(--bg-secondary);
             }
             
-            @keyframes slideInLeft {
-                from {
-                    opacity: 0;
-                    transform: translateX(-30px) scale(0.95);
+            /* Metric Cards */
+            .metric-card {
+                background: var(--bg-glass);
+                border-radius: 16px;
+                padding: 1rem;
+                border: 1px solid var(--border-glass);
+                text-align: center;
+            }
+            
+            /* Typing Indicator */
+            .typing-indicator {
+                display: inline-flex;
+                gap: 0.3rem;
+                padding: 0.5rem 0;
+            }
+            
+            .typing-dot {
+                width: 8px;
+                height: 8px;
+                border-radius: 50%;
+                background: var(--text-secondary);
+            }
+            
+            .typing-dot:nth-child(2) {
+                animation-delay: 0.2s;
+            }
+            
+            .typing-dot:nth-child(3) {
+                animation-delay: 0.4s;
+            }
+            
+            @keyframes typing {
+                0%, 60%, 100% {
+                    transform: translateY(0);
+                    opacity: 0.5;
                 }
-                to {
+                30% {
+                    transform: translateY(-10px);
                     opacity: 1;
-                    transform: translateX(0) scale(1);
                 }
             }
             
-            /* Sidebar Styling */
-            [data-testid="stSidebar"] {
-                background: var(--bg-secondary);
-                backdrop-filter: blur(20px) saturate(180%);
+            /* Only the page header animates in: cards, bubbles and citations
+               are redrawn on every rerun and would replay their entrance each
+               time. Skipped entirely for users who asked for reduced motion */
+            @media (prefers-reduced-motion: no-preference) {
+                .premium-header { animation: fadeInDown 0.6s ease-out; }
+                .premium-subheader { animation: fadeInUp 0.6s ease-out 0.2s both; }
+                .typing-dot { animation: typing 1.4s infinite; }
             }
-            
-            /* Streamlit Component Text Colors - Dark Theme */
-            [data-testid="stSidebar"] * {
-                color: var(--text-primary) !important;
+"""
+
+_CSS_DARK = """
+            /* Root Variables */
+            :root {
+                --bg-primary: #0D0F16;
+                --bg-secondary: rgba(255, 255, 255, 0.05);
+                --bg-glass: rgba(255, 255, 255, 0.08);
+                --text-primary: #ECECEC;
+                --text-secondary: rgba(236, 236, 236, 0.7);
+                --gradient-primary: linear-gradient(135deg, #6A5CFF 0%, #AD7BFF 100%);
+                --gradient-accent: linear-gradient(135deg, #39F3C7 0%, #6A5CFF 100%);
+                --glow-primary: rgba(147, 102, 255, 0.25);
+                --shadow-soft: rgba(0, 0, 0, 0.3);
+                --border-glass: rgba(255, 255, 255, 0.1);
+                --border-bubble: rgba(255, 255, 255, 0.1);
+                --glow-violet: rgba(106, 92, 255, 0.15);
+                --glow-lilac: rgba(173, 123, 255, 0.15);
             }
             
+            /* Streamlit Component Text Colors - Dark Theme */
+            [data-testid="stSidebar"] *,
             [data-testid="stSidebar"] h1,
             [data-testid="stSidebar"] h2,
             [data-testid="stSidebar"] h3,
             [data-testid="stSidebar"] h4,
             [data-testid="stSidebar"] h5,
-            [data-testid="stSidebar"] h6 {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stSidebar"] h6,
             [data-testid="stSidebar"] p,
             [data-testid="stSidebar"] label,
             [data-testid="stSidebar"] span,
@@ -315,25 +368,22 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Checkboxes and radio buttons */
-            [data-testid="stSidebar"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stSidebar"] label,
             /* Expander headers */
-            [data-testid="stSidebar"] summary {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stSidebar"] summary,
             /* Main content area text */
-            .main * {
-                color: var(--text-primary) !important;
-            }
-            
-            .main h1, .main h2, .main h3, .main h4, .main h5, .main h6 {
-                color: var(--text-primary) !important;
-            }
-            
-            .main p, .main span, .main div, .main label {
+            .main *,
+            .main h1,
+            .main h2,
+            .main h3,
+            .main h4,
+            .main h5,
+            .main h6,
+            .main p,
+            .main span,
+            .main div,
+            .main label,
+            [data-testid="stChatInput"] input {
                 color: var(--text-primary) !important;
             }
             
@@ -343,10 +393,6 @@ def get_premium_css(theme: str = "light") -> str:
                 color: var(--text-primary) !important;
             }
             
-            [data-testid="stChatInput"] input {
-                color: var(--text-primary) !important;
-            }
-            
             [data-testid="stChatInput"] input::placeholder {
                 color: var(--text-secondary) !important;
             }
@@ -363,19 +409,14 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* File uploader */
-            [data-testid="stFileUploader"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stFileUploader"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stFileUploader"],
+            [data-testid="stFileUploader"] label,
             /* Metrics */
             [data-testid="stMetricValue"] {
                 color: var(--text-primary) !important;
             }
             
+            /* Metrics */
             [data-testid="stMetricLabel"] {
                 color: var(--text-secondary) !important;
             }
@@ -386,11 +427,12 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Expanders */
-            [data-testid="stExpander"] summary {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stExpander"] div {
+            [data-testid="stExpander"] summary,
+            [data-testid="stExpander"] div,
+            /* Markdown text */
+            .main .stMarkdown,
+            .main .stMarkdown p,
+            .main .stMarkdown strong {
                 color: var(--text-primary) !important;
             }
             
@@ -401,152 +443,82 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Markdown text */
-            .main .stMarkdown {
-                color: var(--text-primary) !important;
-            }
-            
-            .main .stMarkdown p {
-                color: var(--text-primary) !important;
-            }
-            
-            .main .stMarkdown strong {
-                color: var(--text-primary) !important;
-            }
-            
             .main .stMarkdown em {
                 color: var(--text-secondary) !important;
             }
             
             /* Info boxes and alerts */
-            [data-baseweb="notification"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stAlert"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-baseweb="notification"],
+            [data-testid="stAlert"],
             [data-testid="stAlert"] p,
             [data-testid="stAlert"] div,
-            [data-testid="stAlert"] span {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stAlert"] span,
             /* Info, Success, Warning, Error boxes */
-            .stAlert {
-                color: var(--text-primary) !important;
-            }
-            
+            .stAlert,
             .stAlert p,
             .stAlert div,
-            .stAlert span {
-                color: var(--text-primary) !important;
-            }
-            
+            .stAlert span,
             /* Spinner text */
-            [data-testid="stSpinner"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stSpinner"] + div {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stSpinner"],
+            [data-testid="stSpinner"] + div,
             /* Headers in markdown */
-            .main h1, .main h2, .main h3, .main h4, .main h5, .main h6 {
-                color: var(--text-primary) !important;
-            }
-            
+            .main h1,
+            .main h2,
+            .main h3,
+            .main h4,
+            .main h5,
+            .main h6,
             [data-testid="stMarkdownContainer"] h1,
             [data-testid="stMarkdownContainer"] h2,
             [data-testid="stMarkdownContainer"] h3,
             [data-testid="stMarkdownContainer"] h4,
             [data-testid="stMarkdownContainer"] h5,
-            [data-testid="stMarkdownContainer"] h6 {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Dividers */
-            hr {
-                border-color: rgba(255, 255, 255, 0.2) !important;
-            }
-            
-            [data-testid="stHorizontalBlock"] hr {
-                border-color: rgba(255, 255, 255, 0.2) !important;
-            }
-            
+            [data-testid="stMarkdownContainer"] h6,
             /* Expander content */
-            [data-testid="stExpander"] [data-testid="stMarkdownContainer"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stExpander"] [data-testid="stMarkdownContainer"],
             [data-testid="stExpander"] [data-testid="stMarkdownContainer"] p,
             [data-testid="stExpander"] [data-testid="stMarkdownContainer"] li,
             [data-testid="stExpander"] [data-testid="stMarkdownContainer"] ul,
-            [data-testid="stExpander"] [data-testid="stMarkdownContainer"] ol {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stExpander"] [data-testid="stMarkdownContainer"] ol,
             /* Chat messages */
-            [data-testid="stChatMessage"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stChatMessageContent"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="stChatMessageContent"] p {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Selectbox and dropdowns */
-            [data-baseweb="select"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            [data-baseweb="select"] input {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stChatMessage"],
+            [data-testid="stChatMessageContent"],
+            [data-testid="stChatMessageContent"] p,
+            [data-baseweb="select"] input,
             /* Checkbox labels */
-            [data-baseweb="checkbox"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-baseweb="checkbox"] label,
             /* Radio button labels */
-            [data-baseweb="radio"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-baseweb="radio"] label,
             /* Text input labels */
-            [data-baseweb="input"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-baseweb="input"] label,
             /* All Streamlit text elements */
             .stText,
             .stMarkdown,
             .stMarkdown p,
             .stMarkdown li,
             .stMarkdown ul,
-            .stMarkdown ol {
+            .stMarkdown ol,
+            /* Container backgrounds */
+            [data-testid="stVerticalBlock"],
+            /* Subheader and title */
+            [data-testid="stHeader"],
+            /* All divs and spans in main */
+            .main div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]) {
                 color: var(--text-primary) !important;
             }
             
-            /* Container backgrounds */
-            [data-testid="stVerticalBlock"] {
-                color: var(--text-primary) !important;
+            /* Dividers */
+            hr {
+                border-color: rgba(255, 255, 255, 0.2) !important;
             }
             
-            /* Subheader and title */
-            [data-testid="stHeader"] {
-                color: var(--text-primary) !important;
+            [data-testid="stHorizontalBlock"] hr {
+                border-color: rgba(255, 255, 255, 0.2) !important;
             }
             
-            /* All divs and spans in main */
-            .main div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]) {
+            /* Selectbox and dropdowns */
+            [data-baseweb="select"] {
+                background-color: rgba(255, 255, 255, 0.1) !important;
                 color: var(--text-primary) !important;
             }
             
@@ -560,15 +532,16 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Lists */
-            ul, ol, li {
-                color: var(--text-primary) !important;
-            }
-            
+            ul,
+            ol,
+            li,
             /* Strong and emphasis */
-            strong, b {
+            strong,
+            b {
                 color: var(--text-primary) !important;
             }
             
+            /* Strong and emphasis */
             em, i {
                 color: var(--text-secondary) !important;
             }
@@ -580,7 +553,9 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Tables */
-            table {
+            table,
+            /* Progress bars */
+            [data-testid="stProgress"] {
                 color: var(--text-primary) !important;
             }
             
@@ -589,11 +564,6 @@ def get_premium_css(theme: str = "light") -> str:
                 border-color: rgba(255, 255, 255, 0.2) !important;
             }
             
-            /* Progress bars */
-            [data-testid="stProgress"] {
-                color: var(--text-primary) !important;
-            }
-            
             /* Empty states */
             [data-testid="stEmpty"] {
                 color: var(--text-secondary) !important;
@@ -611,75 +581,46 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Status elements */
-            [data-testid="stStatusWidget"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stStatusWidget"],
             /* Streamlit default text elements - comprehensive coverage */
             .element-container,
             .stMarkdown,
-            .stText {
-                color: var(--text-primary) !important;
-            }
-            
+            .stText,
             .element-container p,
             .element-container span,
-            .element-container div {
-                color: var(--text-primary) !important;
-            }
-            
+            .element-container div,
             /* All text in sidebar */
             [data-testid="stSidebar"] .element-container,
             [data-testid="stSidebar"] .stMarkdown,
-            [data-testid="stSidebar"] .stText {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stSidebar"] .stText,
             /* Streamlit widget labels */
-            [data-testid="stWidgetLabel"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stWidgetLabel"],
             /* Streamlit widget value */
-            [data-testid="stWidgetValue"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stWidgetValue"],
             /* All paragraph tags */
-            p {
-                color: var(--text-primary) !important;
-            }
-            
+            p,
             /* All span tags */
-            span:not([class*="premium"]):not([class*="glass"]) {
-                color: var(--text-primary) !important;
-            }
-            
+            span:not([class*="premium"]):not([class*="glass"]),
             /* Streamlit columns */
-            [data-testid="column"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-testid="column"] * {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="column"],
+            [data-testid="column"] *,
             /* Streamlit containers */
-            [data-testid="stVerticalBlock"] > div {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stVerticalBlock"] > div,
             /* Streamlit horizontal blocks */
-            [data-testid="stHorizontalBlock"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stHorizontalBlock"],
             /* Streamlit tabs */
-            [data-baseweb="tab"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-baseweb="tab-list"] button {
+            [data-baseweb="tab"],
+            [data-baseweb="tab-list"] button,
+            /* Streamlit number input */
+            [data-baseweb="input"] input[type="number"],
+            /* Streamlit slider */
+            [data-baseweb="slider"],
+            [data-baseweb="slider"] label,
+            [data-baseweb="textarea"] textarea,
+            /* Streamlit color picker */
+            [data-testid="stColorPicker"],
+            /* Streamlit time input */
+            [data-baseweb="input"] input[type="time"] {
                 color: var(--text-primary) !important;
             }
             
@@ -690,99 +631,53 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Streamlit date input */
-            [data-baseweb="input"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit number input */
-            [data-baseweb="input"] input[type="number"] {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit slider */
-            [data-baseweb="slider"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [data-baseweb="slider"] label {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-baseweb="input"],
             /* Streamlit text area */
             [data-baseweb="textarea"] {
                 background-color: rgba(255, 255, 255, 0.1) !important;
                 color: var(--text-primary) !important;
             }
             
-            [data-baseweb="textarea"] textarea {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit color picker */
-            [data-testid="stColorPicker"] {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit time input */
-            [data-baseweb="input"] input[type="time"] {
-                color: var(--text-primary) !important;
-            }
-            
             /* Streamlit download button */
             [data-testid="stDownloadButton"] {
                 color: white !important;
             }
             
             /* Streamlit data editor */
-            [data-testid="stDataFrame"] {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"],
             /* Streamlit json */
-            [data-testid="stJson"] {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit plotly charts - ensure text is visible */
-            .js-plotly-plot {
-                background-color: transparent !important;
-            }
-            
+            [data-testid="stJson"],
             /* Streamlit dataframe */
-            [data-testid="stDataFrame"] table {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] table,
             /* Streamlit dataframe headers */
-            [data-testid="stDataFrame"] thead {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] thead,
             /* Streamlit dataframe cells */
             [data-testid="stDataFrame"] td,
-            [data-testid="stDataFrame"] th {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] th,
             /* Streamlit dataframe index */
-            [data-testid="stDataFrame"] .index {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .index,
             /* Streamlit dataframe column headers */
-            [data-testid="stDataFrame"] .col_heading {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .col_heading,
             /* Streamlit dataframe row headers */
-            [data-testid="stDataFrame"] .row_heading {
+            [data-testid="stDataFrame"] .row_heading,
+            /* Streamlit dataframe data cells */
+            [data-testid="stDataFrame"] .data,
+            /* Streamlit dataframe pagination */
+            [data-testid="stDataFrame"] .pagination,
+            /* Streamlit dataframe pagination buttons */
+            [data-testid="stDataFrame"] .pagination button,
+            /* Streamlit dataframe toolbar */
+            [data-testid="stDataFrame"] .toolbar,
+            /* Streamlit dataframe toolbar buttons */
+            [data-testid="stDataFrame"] .toolbar button,
+            /* Streamlit dataframe toolbar labels */
+            [data-testid="stDataFrame"] .toolbar label {
                 color: var(--text-primary) !important;
             }
             
-            /* Streamlit dataframe data cells */
-            [data-testid="stDataFrame"] .data {
-                color: var(--text-primary) !important;
+            /* Streamlit plotly charts - ensure text is visible */
+            .js-plotly-plot {
+                background-color: transparent !important;
             }
             
             /* Streamlit dataframe selected cells */
@@ -797,77 +692,48 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Streamlit dataframe filter */
-            [data-testid="stDataFrame"] input {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe pagination */
-            [data-testid="stDataFrame"] .pagination {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe pagination buttons */
-            [data-testid="stDataFrame"] .pagination button {
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] input,
             /* Streamlit dataframe pagination input */
-            [data-testid="stDataFrame"] .pagination input {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .pagination input,
             /* Streamlit dataframe search */
-            [data-testid="stDataFrame"] .search {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .search,
             /* Streamlit dataframe search input */
-            [data-testid="stDataFrame"] .search input {
+            [data-testid="stDataFrame"] .search input,
+            /* Streamlit dataframe toolbar select */
+            [data-testid="stDataFrame"] .toolbar select,
+            /* Streamlit dataframe toolbar input */
+            [data-testid="stDataFrame"] .toolbar input,
+            /* Streamlit dataframe toolbar textarea */
+            [data-testid="stDataFrame"] .toolbar textarea,
+            /* Streamlit dataframe toolbar date */
+            [data-testid="stDataFrame"] .toolbar input[type="date"],
+            /* Streamlit dataframe toolbar time */
+            [data-testid="stDataFrame"] .toolbar input[type="time"],
+            /* Streamlit dataframe toolbar datetime */
+            [data-testid="stDataFrame"] .toolbar input[type="datetime-local"],
+            /* Streamlit dataframe toolbar month */
+            [data-testid="stDataFrame"] .toolbar input[type="month"],
+            /* Streamlit dataframe toolbar week */
+            [data-testid="stDataFrame"] .toolbar input[type="week"],
+            /* Streamlit dataframe toolbar url */
+            [data-testid="stDataFrame"] .toolbar input[type="url"],
+            /* Streamlit dataframe toolbar email */
+            [data-testid="stDataFrame"] .toolbar input[type="email"],
+            /* Streamlit dataframe toolbar tel */
+            [data-testid="stDataFrame"] .toolbar input[type="tel"],
+            /* Streamlit dataframe toolbar search */
+            [data-testid="stDataFrame"] .toolbar input[type="search"],
+            /* Streamlit dataframe toolbar file */
+            [data-testid="stDataFrame"] .toolbar input[type="file"] {
                 background-color: rgba(255, 255, 255, 0.1) !important;
                 color: var(--text-primary) !important;
             }
             
-            /* Streamlit dataframe toolbar */
-            [data-testid="stDataFrame"] .toolbar {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar buttons */
-            [data-testid="stDataFrame"] .toolbar button {
-                color: var(--text-primary) !important;
-            }
-            
             /* Streamlit dataframe toolbar icons */
             [data-testid="stDataFrame"] .toolbar svg {
                 fill: var(--text-primary) !important;
             }
             
-            /* Streamlit dataframe toolbar labels */
-            [data-testid="stDataFrame"] .toolbar label {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar select */
-            [data-testid="stDataFrame"] .toolbar select {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar input */
-            [data-testid="stDataFrame"] .toolbar input {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar textarea */
-            [data-testid="stDataFrame"] .toolbar textarea {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
             /* Streamlit dataframe toolbar checkbox */
             [data-testid="stDataFrame"] .toolbar input[type="checkbox"] {
                 accent-color: #6A5CFF !important;
@@ -888,66 +754,6 @@ def get_premium_css(theme: str = "light") -> str:
                 background-color: rgba(255, 255, 255, 0.1) !important;
             }
             
-            /* Streamlit dataframe toolbar date */
-            [data-testid="stDataFrame"] .toolbar input[type="date"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar time */
-            [data-testid="stDataFrame"] .toolbar input[type="time"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar datetime */
-            [data-testid="stDataFrame"] .toolbar input[type="datetime-local"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar month */
-            [data-testid="stDataFrame"] .toolbar input[type="month"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar week */
-            [data-testid="stDataFrame"] .toolbar input[type="week"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar url */
-            [data-testid="stDataFrame"] .toolbar input[type="url"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar email */
-            [data-testid="stDataFrame"] .toolbar input[type="email"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar tel */
-            [data-testid="stDataFrame"] .toolbar input[type="tel"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar search */
-            [data-testid="stDataFrame"] .toolbar input[type="search"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar file */
-            [data-testid="stDataFrame"] .toolbar input[type="file"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
             /* Streamlit dataframe toolbar submit */
             [data-testid="stDataFrame"] .toolbar input[type="submit"] {
                 background: var(--gradient-primary) !important;
@@ -955,11 +761,7 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Streamlit dataframe toolbar reset */
-            [data-testid="stDataFrame"] .toolbar input[type="reset"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .toolbar input[type="reset"],
             /* Streamlit dataframe toolbar button */
             [data-testid="stDataFrame"] .toolbar button {
                 background-color: rgba(255, 255, 255, 0.1) !important;
@@ -973,11 +775,7 @@ def get_premium_css(theme: str = "light") -> str:
             }
             
             /* Streamlit dataframe toolbar button secondary */
-            [data-testid="stDataFrame"] .toolbar button[type="button"] {
-                background-color: rgba(255, 255, 255, 0.1) !important;
-                color: var(--text-primary) !important;
-            }
-            
+            [data-testid="stDataFrame"] .toolbar button[type="button"],
             /* Streamlit dataframe toolbar button reset */
             [data-testid="stDataFrame"] .toolbar button[type="reset"] {
                 background-color: rgba(255, 255, 255, 0.1) !important;
@@ -1008,475 +806,197 @@ def get_premium_css(theme: str = "light") -> str:
             
             /* Streamlit dataframe toolbar button visited */
             [data-testid="stDataFrame"] .toolbar button:visited {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link */
-            [data-testid="stDataFrame"] .toolbar a {
-                color: #6A5CFF !important;
-            }
-            
-            [data-testid="stDataFrame"] .toolbar a:hover {
-                color: #AD7BFF !important;
-            }
-            
-            [data-testid="stDataFrame"] .toolbar a:visited {
-                color: #6A5CFF !important;
-            }
-            
-            [data-testid="stDataFrame"] .toolbar a:active {
-                color: #AD7BFF !important;
-            }
-            
-            [data-testid="stDataFrame"] .toolbar a:focus {
-                outline: 2px solid #6A5CFF !important;
-                outline-offset: 2px !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link disabled */
-            [data-testid="stDataFrame"] .toolbar a:disabled {
-                opacity: 0.5 !important;
-                color: var(--text-secondary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link hover disabled */
-            [data-testid="stDataFrame"] .toolbar a:hover:disabled {
-                color: var(--text-secondary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link active disabled */
-            [data-testid="stDataFrame"] .toolbar a:active:disabled {
-                color: var(--text-secondary) !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link focus disabled */
-            [data-testid="stDataFrame"] .toolbar a:focus:disabled {
-                outline: none !important;
-            }
-            
-            /* Streamlit dataframe toolbar button link visited disabled */
-            [data-testid="stDataFrame"] .toolbar a:visited:disabled {
-                color: var(--text-secondary) !important;
-            }
-            
-            /* Metric Cards */
-            .metric-card {
-                background: var(--bg-glass);
-                backdrop-filter: blur(15px);
-                border-radius: 16px;
-                padding: 1rem;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                text-align: center;
-            }
-            
-            /* Typing Indicator */
-            .typing-indicator {
-                display: inline-flex;
-                gap: 0.3rem;
-                padding: 0.5rem 0;
-            }
-            
-            .typing-dot {
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: var(--text-secondary);
-                animation: typing 1.4s infinite;
-            }
-            
-            .typing-dot:nth-child(2) {
-                animation-delay: 0.2s;
-            }
-            
-            .typing-dot:nth-child(3) {
-                animation-delay: 0.4s;
-            }
-            
-            @keyframes typing {
-                0%, 60%, 100% {
-                    transform: translateY(0);
-                    opacity: 0.5;
-                }
-                30% {
-                    transform: translateY(-10px);
-                    opacity: 1;
-                }
-            }
-            
-            /* ============================================
-               COMPREHENSIVE CATCH-ALL FOR DARK THEME
-               ============================================ */
-            
-            /* Force all text in sidebar to be visible */
-            [data-testid="stSidebar"] p,
-            [data-testid="stSidebar"] span:not([class]),
-            [data-testid="stSidebar"] div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]),
-            [data-testid="stSidebar"] label,
-            [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3,
-            [data-testid="stSidebar"] h4, [data-testid="stSidebar"] h5, [data-testid="stSidebar"] h6 {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Force all text in main content to be visible */
-            .main p:not([class]),
-            .main span:not([class]),
-            .main div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]),
-            .main label,
-            .main h1, .main h2, .main h3, .main h4, .main h5, .main h6 {
-                color: var(--text-primary) !important;
-            }
-            
-            /* All Streamlit components text */
-            [data-testid*="st"] p,
-            [data-testid*="st"] span:not([class]),
-            [data-testid*="st"] div:not([class*="premium"]):not([class*="glass"]) {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Info/Success/Warning/Error boxes - ensure text visible */
-            [role="alert"],
-            .stAlert,
-            [data-baseweb="notification"],
-            [data-testid="stAlert"] {
-                color: var(--text-primary) !important;
-            }
-            
-            [role="alert"] *,
-            .stAlert *,
-            [data-baseweb="notification"] *,
-            [data-testid="stAlert"] * {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Spinner and loading text */
-            [data-testid="stSpinner"] + div,
-            [data-testid="stSpinner"] ~ div {
-                color: var(--text-primary) !important;
-            }
-            
-            /* All markdown content */
-            [data-testid="stMarkdownContainer"],
-            [data-testid="stMarkdownContainer"] * {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Expander content */
-            details,
-            details * {
-                color: var(--text-primary) !important;
-            }
-            
-            /* Dividers */
-            hr, .stDivider, [data-testid="stHorizontalBlock"] hr {
-                border-color: rgba(255, 255, 255, 0.3) !important;
-                background-color: rgba(255, 255, 255, 0.3) !important;
-            }
-            
-            /* Ensure buttons have visible text */
-            button:not([disabled]) {
-                color: white !important;
-            }
-            
-            button[kind="secondary"]:not([disabled]) {
-                color: var(--text-primary) !important;
-            }
-        </style>
-        """
-    else:  # Light theme
-        return """
-        <style>
-            /* Import Google Fonts */
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-            
-            /* Root Variables */
-            :root {
-                --bg-primary: #F7F9FC;
-                --bg-secondary: rgba(255, 255, 255, 0.6);
-                --bg-glass: rgba(255, 255, 255, 0.55);
-                --text-primary: #1B1B1B;
-                --text-secondary: rgba(27, 27, 27, 0.6);
-                --gradient-primary: linear-gradient(135deg, #6A5CFF 0%, #AD7BFF 100%);
-                --gradient-accent: linear-gradient(135deg, #39F3C7 0%, #6A5CFF 100%);
-                --glow-primary: rgba(106, 92, 255, 0.2);
-                --shadow-soft: rgba(0, 0, 0, 0.08);
-            }
-            
-            /* Global Styles */
-            * {
-                font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-            }
-            
-            .stApp {
-                background: var(--bg-primary);
-                background-image: 
-                    radial-gradient(at 20% 30%, rgba(106, 92, 255, 0.08) 0px, transparent 50%),
-                    radial-gradient(at 80% 70%, rgba(173, 123, 255, 0.08) 0px, transparent 50%);
-            }
-            
-            /* Premium Header */
-            .premium-header {
-                font-size: 3.5rem;
-                font-weight: 800;
-                background: var(--gradient-primary);
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                background-clip: text;
-                text-align: center;
-                margin: 2rem 0 0.5rem 0;
-                letter-spacing: -0.02em;
-                animation: fadeInDown 0.6s ease-out;
-            }
-            
-            .premium-subheader {
-                font-size: 1.1rem;
-                color: var(--text-secondary);
-                text-align: center;
-                margin-bottom: 3rem;
-                font-weight: 400;
-                animation: fadeInUp 0.6s ease-out 0.2s both;
-            }
-            
-            /* Glass Cards */
-            .glass-card {
-                background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
-                -webkit-backdrop-filter: blur(20px) saturate(180%);
-                border-radius: 20px;
-                border: 1px solid rgba(255, 255, 255, 0.5);
-                padding: 1.5rem;
-                margin: 1rem 0;
-                box-shadow: 0 8px 32px var(--shadow-soft);
-                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                animation: fadeIn 0.5s ease-out;
-            }
-            
-            .glass-card:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 12px 40px var(--shadow-soft);
-                border-color: rgba(106, 92, 255, 0.3);
-            }
-            
-            /* Chat Bubbles */
-            .chat-bubble-user {
-                background: var(--gradient-primary);
-                color: white;
-                padding: 1rem 1.5rem;
-                border-radius: 20px 20px 4px 20px;
-                margin: 1rem 0;
-                max-width: 75%;
-                margin-left: auto;
-                box-shadow: 0 4px 20px var(--glow-primary);
-                animation: slideInRight 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-                font-weight: 400;
-                line-height: 1.6;
-            }
-            
-            .chat-bubble-assistant {
-                background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
-                color: var(--text-primary);
-                padding: 1rem 1.5rem;
-                border-radius: 20px 20px 20px 4px;
-                margin: 1rem 0;
-                max-width: 75%;
-                border: 1px solid rgba(255, 255, 255, 0.6);
-                box-shadow: 0 4px 20px var(--shadow-soft);
-                animation: slideInLeft 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-                font-weight: 400;
-                line-height: 1.6;
-            }
-            
-            /* Premium Buttons */
-            .premium-button {
-                background: var(--gradient-primary);
-                color: white;
-                border: none;
-                border-radius: 12px;
-                padding: 0.75rem 2rem;
-                font-weight: 600;
-                font-size: 0.95rem;
-                cursor: pointer;
-                transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-                box-shadow: 0 4px 15px var(--glow-primary);
-                position: relative;
-                overflow: hidden;
-            }
-            
-            .premium-button:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 6px 25px var(--glow-primary);
-            }
-            
-            .premium-button:active {
-                transform: translateY(0) scale(0.98);
-            }
-            
-            /* Citation Cards */
-            .citation-card {
-                background: var(--bg-glass);
-                backdrop-filter: blur(15px) saturate(180%);
-                border-radius: 16px;
-                padding: 1.25rem;
-                margin: 0.75rem 0;
-                border: 1px solid rgba(255, 255, 255, 0.5);
-                box-shadow: 0 4px 16px var(--shadow-soft);
-                transition: all 0.3s ease;
-                animation: fadeInUp 0.4s ease-out;
-            }
-            
-            .citation-card:hover {
-                transform: translateY(-2px);
-                border-color: rgba(106, 92, 255, 0.3);
-                box-shadow: 0 6px 24px var(--shadow-soft);
-            }
-            
-            .page-badge {
-                display: inline-block;
-                background: var(--gradient-primary);
-                color: white;
-                padding: 0.25rem 0.75rem;
-                border-radius: 20px;
-                font-size: 0.75rem;
-                font-weight: 600;
-                margin-right: 0.5rem;
-            }
-            
-            /* Progress Bar */
-            .premium-progress {
-                background: var(--bg-glass);
-                border-radius: 10px;
-                height: 8px;
-                overflow: hidden;
-                position: relative;
-            }
-            
-            .premium-progress-fill {
-                background: var(--gradient-primary);
-                height: 100%;
-                border-radius: 10px;
-                transition: width 0.3s ease;
-                box-shadow: 0 0 10px var(--glow-primary);
+                color: var(--text-primary) !important;
             }
             
-            /* Upload Zone */
-            .upload-zone {
-                background: var(--bg-glass);
-                backdrop-filter: blur(20px) saturate(180%);
-                border: 2px dashed rgba(106, 92, 255, 0.4);
-                border-radius: 20px;
-                padding: 3rem 2rem;
-                text-align: center;
-                transition: all 0.3s ease;
-                cursor: pointer;
+            /* Streamlit dataframe toolbar button link */
+            [data-testid="stDataFrame"] .toolbar a {
+                color: #6A5CFF !important;
             }
             
-            .upload-zone:hover {
-                border-color: rgba(106, 92, 255, 0.7);
-                background: rgba(106, 92, 255, 0.1);
-                transform: scale(1.02);
+            [data-testid="stDataFrame"] .toolbar a:hover {
+                color: #AD7BFF !important;
             }
             
-            /* Animations */
-            @keyframes fadeIn {
-                from { opacity: 0; }
-                to { opacity: 1; }
+            [data-testid="stDataFrame"] .toolbar a:visited {
+                color: #6A5CFF !important;
             }
             
-            @keyframes fadeInDown {
-                from {
-                    opacity: 0;
-                    transform: translateY(-20px);
-                }
-                to {
-                    opacity: 1;
-                    transform: translateY(0);
-                }
+            [data-testid="stDataFrame"] .toolbar a:active {
+                color: #AD7BFF !important;
             }
             
-            @keyframes fadeInUp {
-                from {
-                    opacity: 0;
-                    transform: translateY(20px);
-                }
-                to {
-                    opacity: 1;
-                    transform: translateY(0);
-                }
+            [data-testid="stDataFrame"] .toolbar a:focus {
+                outline: 2px solid #6A5CFF !important;
+                outline-offset: 2px !important;
             }
             
-            @keyframes slideInRight {
-                from {
-                    opacity: 0;
-                    transform: translateX(30px) scale(0.95);
-                }
-                to {
-                    opacity: 1;
-                    transform: translateX(0) scale(1);
-                }
+            /* Streamlit dataframe toolbar button link disabled */
+            [data-testid="stDataFrame"] .toolbar a:disabled {
+                opacity: 0.5 !important;
+                color: var(--text-secondary) !important;
             }
             
-            @keyframes slideInLeft {
-                from {
-                    opacity: 0;
-                    transform: translateX(-30px) scale(0.95);
-                }
-                to {
-                    opacity: 1;
-                    transform: translateX(0) scale(1);
-                }
+            /* Streamlit dataframe toolbar button link hover disabled */
+            [data-testid="stDataFrame"] .toolbar a:hover:disabled {
+                color: var(--text-secondary) !important;
             }
             
-            /* Sidebar Styling */
-            [data-testid="stSidebar"] {
-                background: var(--bg-secondary);
-                backdrop-filter: blur(20px) saturate(180%);
+            /* Streamlit dataframe toolbar button link active disabled */
+            [data-testid="stDataFrame"] .toolbar a:active:disabled {
+                color: var(--text-secondary) !important;
             }
             
-            /* Metric Cards */
-            .metric-card {
-                background: var(--bg-glass);
-                backdrop-filter: blur(15px);
-                border-radius: 16px;
-                padding: 1rem;
-                border: 1px solid rgba(255, 255, 255, 0.5);
-                text-align: center;
+            /* Streamlit dataframe toolbar button link focus disabled */
+            [data-testid="stDataFrame"] .toolbar a:focus:disabled {
+                outline: none !important;
             }
             
-            /* Typing Indicator */
-            .typing-indicator {
-                display: inline-flex;
-                gap: 0.3rem;
-                padding: 0.5rem 0;
+            /* Streamlit dataframe toolbar button link visited disabled */
+            [data-testid="stDataFrame"] .toolbar a:visited:disabled {
+                color: var(--text-secondary) !important;
             }
             
-            .typing-dot {
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: var(--text-secondary);
-                animation: typing 1.4s infinite;
+            /* ============================================
+               COMPREHENSIVE CATCH-ALL FOR DARK THEME
+               ============================================ */
+            
+            /* Force all text in sidebar to be visible */
+            [data-testid="stSidebar"] p,
+            [data-testid="stSidebar"] span:not([class]),
+            [data-testid="stSidebar"] div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]),
+            [data-testid="stSidebar"] label,
+            [data-testid="stSidebar"] h1,
+            [data-testid="stSidebar"] h2,
+            [data-testid="stSidebar"] h3,
+            [data-testid="stSidebar"] h4,
+            [data-testid="stSidebar"] h5,
+            [data-testid="stSidebar"] h6,
+            /* Force all text in main content to be visible */
+            .main p:not([class]),
+            .main span:not([class]),
+            .main div:not([class*="premium"]):not([class*="glass"]):not([class*="chat"]):not([class*="citation"]),
+            .main label,
+            .main h1,
+            .main h2,
+            .main h3,
+            .main h4,
+            .main h5,
+            .main h6,
+            /* All Streamlit components text */
+            [data-testid*="st"] p,
+            [data-testid*="st"] span:not([class]),
+            [data-testid*="st"] div:not([class*="premium"]):not([class*="glass"]),
+            /* Info/Success/Warning/Error boxes - ensure text visible */
+            [role="alert"],
+            .stAlert,
+            [data-baseweb="notification"],
+            [data-testid="stAlert"],
+            [role="alert"] *,
+            .stAlert *,
+            [data-baseweb="notification"] *,
+            [data-testid="stAlert"] *,
+            /* Spinner and loading text */
+            [data-testid="stSpinner"] + div,
+            [data-testid="stSpinner"] ~ div,
+            /* All markdown content */
+            [data-testid="stMarkdownContainer"],
+            [data-testid="stMarkdownContainer"] *,
+            /* Expander content */
+            details,
+            details * {
+                color: var(--text-primary) !important;
             }
             
-            .typing-dot:nth-child(2) {
-                animation-delay: 0.2s;
+            /* Dividers */
+            hr, .stDivider, [data-testid="stHorizontalBlock"] hr {
+                border-color: rgba(255, 255, 255, 0.3) !important;
+                background-color: rgba(255, 255, 255, 0.3) !important;
             }
             
-            .typing-dot:nth-child(3) {
-                animation-delay: 0.4s;
+            /* Ensure buttons have visible text */
+            button:not([disabled]) {
+                color: white !important;
             }
             
-            @keyframes typing {
-                0%, 60%, 100% {
-                    transform: translateY(0);
-                    opacity: 0.5;
-                }
-                30% {
-                    transform: translateY(-10px);
-                    opacity: 1;
-                }
+            button[kind="secondary"]:not([disabled]) {
+                color: var(--text-primary) !important;
+            }
+        </style>
+"""
+
+_CSS_LIGHT = """
+            /* Root Variables */
+            :root {
+                --bg-primary: #F7F9FC;
+                --bg-secondary: rgba(255, 255, 255, 0.6);
+                --bg-glass: rgba(255, 255, 255, 0.55);
+                --text-primary: #1B1B1B;
+                --text-secondary: rgba(27, 27, 27, 0.6);
+                --gradient-primary: linear-gradient(135deg, #6A5CFF 0%, #AD7BFF 100%);
+                --gradient-accent: linear-gradient(135deg, #39F3C7 0%, #6A5CFF 100%);
+                --glow-primary: rgba(106, 92, 255, 0.2);
+                --shadow-soft: rgba(0, 0, 0, 0.08);
+                --border-glass: rgba(255, 255, 255, 0.5);
+                --border-bubble: rgba(255, 255, 255, 0.6);
+                --glow-violet: rgba(106, 92, 255, 0.08);
+                --glow-lilac: rgba(173, 123, 255, 0.08);
             }
         </style>
-        """
+"""
+
+
+def _minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from a stylesheet"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{}:;,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+# Built (and minified) once at import; every rerun just picks the theme's string
+_MINIFIED_CSS = {
+    theme: _minify_css(_CSS_BASE + css)
+    for theme, css in (("dark", _CSS_DARK), ("light", _CSS_LIGHT))
+}
+
+# Content hash of each stylesheet, also used as the id of its <style> tag so
+# the browser-side element is identifiable across reruns
+_CSS_HASH = {
+    theme: hashlib.blake2s(css.encode("utf-8"), digest_size=6).hexdigest()
+    for theme, css in _MINIFIED_CSS.items()
+}
+
+_CSS = {
+    theme: _FONT_LINKS + css.replace("<style>", f'<style id="premium-css-{_CSS_HASH[theme]}">', 1)
+    for theme, css in _MINIFIED_CSS.items()
+}
+
+
+def get_premium_css(theme: str = "light") -> str:
+    """
+    Get premium CSS with glassmorphism, gradients, and animations
+    
+    Args:
+        theme: 'light' or 'dark'
+        
+    Returns:
+        CSS string
+    """
+    return _CSS.get(theme, _CSS["light"])
+
+
+def get_premium_css_hash(theme: str = "light") -> str:
+    """
+    Get a short content hash of the premium CSS
+    
+    Args:
+        theme: 'light' or 'dark'
+        
+    Returns:
+        Hex digest that changes whenever the theme's stylesheet changes
+    """
+    return _CSS_HASH.get(theme, _CSS_HASH["light"])
 
 
 def render_chat_message(role: str, content: str, sources: Optional[List[Dict]] = None):
@@ -1488,36 +1008,24 @@ def render_chat_message(role: str, content: str, sources: Optional[List[Dict]] =
         content: Message content
         sources: Optional list of sources
     """
-    if role == "user":
-        st.markdown(
-            f'<div class="chat-bubble-user">{content}</div>',
-            unsafe_allow_html=True
-        )
-    else:
-        st.markdown(
-            f'<div class="chat-bubble-assistant">{content}</div>',
-            unsafe_allow_html=True
-        )
-        
-        # Display sources if available
-        if sources and len(sources) > 0:
-            with st.expander("📚 Cited References", expanded=False):
-                for source in sources:
-                    render_citation_card(source)
+    st.markdown(_message_html(role, content), unsafe_allow_html=True)
+    
+    # Display sources if available
+    if role != "user":
+        render_source_citations(sources)
 
 
-def render_citation_card(source: Dict):
-    """Render a premium citation card"""
-    page_num = source.get('page', 0)
-    filename = source.get('filename', 'Unknown')
-    relevance = source.get('relevance_percent', 0)
-    snippet = source.get('snippet', source.get('text', ''))[:300]
-    
-    st.markdown(
-        f'''
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def _message_html(role: str, content: str) -> str:
+    """Build the HTML of a chat bubble, reused for unchanged past messages"""
+    bubble = "chat-bubble-user" if role == "user" else "chat-bubble-assistant"
+    return f'<div class="{bubble}">{content}</div>'
+
+
+_CITATION_TMPL = '''
         <div class="citation-card">
             <div style="display: flex; align-items: center; margin-bottom: 0.75rem;">
-                <span class="page-badge">Page {page_num}</span>
+                <span class="page-badge">Page {page}</span>
                 <strong style="flex: 1;">{filename}</strong>
                 <span style="color: #6A5CFF; font-weight: 600;">{relevance}% match</span>
             </div>
@@ -1525,9 +1033,24 @@ def render_citation_card(source: Dict):
                 {snippet}...
             </p>
         </div>
-        ''',
-        unsafe_allow_html=True
-    )
+        '''
+
+
+def _citation_html(source: Dict) -> str:
+    """Build the HTML of a citation card"""
+    return _CITATION_TMPL.format_map({
+        'page': source.get('page', 0),
+        'filename': html.escape(source.get('filename', 'Unknown')),
+        'relevance': source.get('relevance_percent', 0),
+        # PDF text can contain markup characters; truncate before escaping
+        # so an entity is never cut in half
+        'snippet': html.escape((source.get('snippet') or source.get('text') or '')[:300]),
+    })
+
+
+def render_citation_card(source: Dict):
+    """Render a premium citation card"""
+    st.markdown(_citation_html(source), unsafe_allow_html=True)
 
 
 def render_source_citations(sources: List[Dict], expanded: bool = False):
@@ -1541,9 +1064,21 @@ def render_source_citations(sources: List[Dict], expanded: bool = False):
     if not sources:
         return
     
+    # All cards go out as one element instead of one per source
     with st.expander("📚 Cited References", expanded=expanded):
-        for source in sources:
-            render_citation_card(source)
+        st.markdown("".join(_citation_html(source) for source in sources), unsafe_allow_html=True)
+
+
+_PROGRESS_TMPL = '''
+        <div class="premium-progress" style="{bar_style}">
+            <div class="premium-progress-fill" style="width: {pct}%;"></div>
+        </div>
+        <p style="text-align: center; {label_style}">
+            {label}: {whole_pct}%
+        </p>
+        '''
+
+_METRIC_TMPL = '<div class="metric-card"><div style="font-size: 1.5rem; font-weight: 700; color: #6A5CFF;">{value}</div><div style="font-size: 0.85rem; color: var(--text-secondary);">{label}</div></div>'
 
 
 def render_sidebar_stats(
@@ -1565,33 +1100,23 @@ def render_sidebar_stats(
     
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        st.markdown(
-            f'<div class="metric-card"><div style="font-size: 1.5rem; font-weight: 700; color: #6A5CFF;">{total_pdfs}</div><div style="font-size: 0.85rem; color: var(--text-secondary);">PDFs</div></div>',
-            unsafe_allow_html=True
-        )
+        st.markdown(_METRIC_TMPL.format(value=total_pdfs, label="PDFs"), unsafe_allow_html=True)
     with col2:
-        st.markdown(
-            f'<div class="metric-card"><div style="font-size: 1.5rem; font-weight: 700; color: #6A5CFF;">{total_pages}</div><div style="font-size: 0.85rem; color: var(--text-secondary);">Pages</div></div>',
-            unsafe_allow_html=True
-        )
-    
-    st.markdown(
-        f'<div class="metric-card"><div style="font-size: 1.5rem; font-weight: 700; color: #6A5CFF;">{total_chunks}</div><div style="font-size: 0.85rem; color: var(--text-secondary);">Chunks</div></div>',
-        unsafe_allow_html=True
-    )
+        st.markdown(_METRIC_TMPL.format(value=total_pages, label="Pages"), unsafe_allow_html=True)
     
+    # The chunk count and the progress bar share one element
+    markup = _METRIC_TMPL.format(value=total_chunks, label="Chunks")
     if embedding_progress is not None:
-        st.markdown(
-            f'''
-            <div class="premium-progress" style="margin-top: 1rem;">
-                <div class="premium-progress-fill" style="width: {embedding_progress * 100}%;"></div>
-            </div>
-            <p style="text-align: center; font-size: 0.85rem; color: var(--text-secondary); margin-top: 0.5rem;">
-                Embedding: {int(embedding_progress * 100)}%
-            </p>
-            ''',
-            unsafe_allow_html=True
+        pct = embedding_progress * 100.0
+        # The label truncates so it never reads 100% while work remains
+        markup += _PROGRESS_TMPL.format(
+            pct=pct,
+            whole_pct=int(pct),
+            label="Embedding",
+            bar_style="margin-top: 1rem;",
+            label_style="font-size: 0.85rem; color: var(--text-secondary); margin-top: 0.5rem;"
         )
+    st.markdown(markup, unsafe_allow_html=True)
 
 
 def render_history_panel(chat_history: List[Dict]):
@@ -1610,24 +1135,27 @@ def render_history_panel(chat_history: List[Dict]):
     
     st.sidebar.markdown("### 💬 Chat History")
     
-    # Show last 10 messages
-    for i, msg in enumerate(chat_history[-10:], 1):
+    # Show the most recent messages, written as a single element
+    extra = len(chat_history) - HISTORY_PANEL_SIZE
+    parts = []
+    for i, msg in enumerate(chat_history[-HISTORY_PANEL_SIZE:], 1):
         role = msg.get('role', 'user')
-        content = msg.get('content', '')[:50] + "..." if len(msg.get('content', '')) > 50 else msg.get('content', '')
+        content = msg.get('content', '')
+        if len(content) > 50:
+            content = content[:50] + "..."
         
         if role == 'user':
-            st.sidebar.markdown(
-                f'<div class="glass-card" style="padding: 0.75rem; margin: 0.5rem 0;"><strong style="color: #6A5CFF;">Q{i}:</strong> <span style="color: var(--text-secondary);">{content}</span></div>',
-                unsafe_allow_html=True
+            parts.append(
+                f'<div class="glass-card" style="padding: 0.75rem; margin: 0.5rem 0;"><strong style="color: #6A5CFF;">Q{i}:</strong> <span style="color: var(--text-secondary);">{content}</span></div>'
             )
         else:
-            st.sidebar.markdown(
-                f'<div class="glass-card" style="padding: 0.75rem; margin: 0.5rem 0;"><em style="color: var(--text-secondary);">A{i}:</em> <span style="color: var(--text-secondary);">{content[:30]}...</span></div>',
-                unsafe_allow_html=True
+            parts.append(
+                f'<div class="glass-card" style="padding: 0.75rem; margin: 0.5rem 0;"><em style="color: var(--text-secondary);">A{i}:</em> <span style="color: var(--text-secondary);">{content[:30]}...</span></div>'
             )
+    st.sidebar.markdown("".join(parts), unsafe_allow_html=True)
     
-    if len(chat_history) > 10:
-        st.sidebar.caption(f"... and {len(chat_history) - 10} more messages")
+    if extra > 0:
+        st.sidebar.caption(f"... and {extra} more messages")
 
 
 def render_summarization_buttons():
@@ -1670,15 +1198,35 @@ def render_progress_bar(stage: str, progress: float):
         stage: Stage name
         progress: Progress (0-1)
     """
+    pct = progress * 100.0
     st.markdown(
-        f'''
-        <div class="premium-progress" style="margin: 1rem 0;">
-            <div class="premium-progress-fill" style="width: {progress * 100}%;"></div>
-        </div>
-        <p style="text-align: center; font-size: 0.9rem; color: var(--text-secondary);">
-            {stage}: {int(progress * 100)}%
-        </p>
-        ''',
+        _PROGRESS_TMPL.format(
+            pct=pct,
+            whole_pct=int(pct),
+            label=stage,
+            bar_style="margin: 1rem 0;",
+            label_style="font-size: 0.9rem; color: var(--text-secondary);"
+        ),
+        unsafe_allow_html=True
+    )
+
+
+# Accent colour, background tint and icon of each status message level
+_STATUS = {
+    "error": ("#FF6B6B", "rgba(255, 107, 107, 0.1)", "❌"),
+    "success": ("#39F3C7", "rgba(57, 243, 199, 0.1)", "✅"),
+    "info": ("#6A5CFF", "rgba(106, 92, 255, 0.1)", "ℹ️"),
+    "warning": ("#FFA726", "rgba(255, 167, 38, 0.1)", "⚠️"),
+}
+
+_STATUS_TMPL = '<div class="glass-card" style="border-left: 4px solid {color}; background: {background};"><strong style="color: {color};">{icon} {message}</strong></div>'
+
+
+def _render_status(level: str, message: str):
+    """Render a status message card for the given level"""
+    color, background, icon = _STATUS[level]
+    st.markdown(
+        _STATUS_TMPL.format(color=color, background=background, icon=icon, message=message),
         unsafe_allow_html=True
     )
 
@@ -1691,10 +1239,7 @@ def render_error_message(error: str, details: Optional[str] = None):
         error: Error message
         details: Optional detailed error information
     """
-    st.markdown(
-        f'<div class="glass-card" style="border-left: 4px solid #FF6B6B; background: rgba(255, 107, 107, 0.1);"><strong style="color: #FF6B6B;">❌ {error}</strong></div>',
-        unsafe_allow_html=True
-    )
+    _render_status("error", error)
     if details:
         with st.expander("Error Details"):
             st.code(details)
@@ -1707,10 +1252,7 @@ def render_success_message(message: str):
     Args:
         message: Success message
     """
-    st.markdown(
-        f'<div class="glass-card" style="border-left: 4px solid #39F3C7; background: rgba(57, 243, 199, 0.1);"><strong style="color: #39F3C7;">✅ {message}</strong></div>',
-        unsafe_allow_html=True
-    )
+    _render_status("success", message)
 
 
 def render_info_message(message: str):
@@ -1720,10 +1262,7 @@ def render_info_message(message: str):
     Args:
         message: Info message
     """
-    st.markdown(
-        f'<div class="glass-card" style="border-left: 4px solid #6A5CFF; background: rgba(106, 92, 255, 0.1);"><strong style="color: #6A5CFF;">ℹ️ {message}</strong></div>',
-        unsafe_allow_html=True
-    )
+    _render_status("info", message)
 
 
 def render_warning_message(message: str):
@@ -1733,25 +1272,43 @@ def render_warning_message(message: str):
     Args:
         message: Warning message
     """
-    st.markdown(
-        f'<div class="glass-card" style="border-left: 4px solid #FFA726; background: rgba(255, 167, 38, 0.1);"><strong style="color: #FFA726;">⚠️ {message}</strong></div>',
-        unsafe_allow_html=True
-    )
+    _render_status("warning", message)
+
 
+_TYPING_INDICATOR = '<div class="typing-indicator"><div class="typing-dot"></div><div class="typing-dot"></div><div class="typing-dot"></div></div>'
 
-def render_streaming_message(placeholder, content_so_far: str):
+
+def render_streaming_message(placeholder, content_so_far: str, final: bool = False) -> bool:
     """
     Update streaming message placeholder with typing indicator
     
+    Repaints are throttled to one per STREAMING_REFRESH_INTERVAL, since
+    every update re-renders the element in the browser.
+    
     Args:
         placeholder: Streamlit placeholder
         content_so_far: Accumulated content
+        final: Whether the stream has ended; always painted, without cursor
+        
+    Returns:
+        True if the placeholder was repainted
     """
-    typing_indicator = '<div class="typing-indicator"><div class="typing-dot"></div><div class="typing-dot"></div><div class="typing-dot"></div></div>'
+    now = time.monotonic()
+    if not final and now - getattr(placeholder, '_last_stream_render', 0.0) < STREAMING_REFRESH_INTERVAL:
+        return False
+    placeholder._last_stream_render = now
+    
+    if final:
+        body = content_so_far
+    elif content_so_far:
+        body = f'{content_so_far}<span style="opacity: 0.5;">▌</span>'
+    else:
+        body = _TYPING_INDICATOR
     placeholder.markdown(
-        f'<div class="chat-bubble-assistant">{content_so_far}<span style="opacity: 0.5;">▌</span></div>',
+        f'<div class="chat-bubble-assistant">{body}</div>',
         unsafe_allow_html=True
     )
+    return True
 
 
 def get_custom_css(theme: str = "light") -> str:
@@ -70,17 +70,17 @@ def chunk_text_by_tokens(
         
         # Try to break at sentence boundary
         if end < text_length:
-            # Look for sentence boundary (., !, ?)
-            for i in range(end, max(start + char_overlap, end - 200), -1):
-                if text[i] in ['.', '!', '?', '\n']:
-                    end = i + 1
-                    break
+            # Look for sentence boundary (., !, ?) with C-level rfind scans
+            lower = max(start + char_overlap, end - 200) + 1
+            boundary = max(text.rfind(mark, lower, end + 1) for mark in '.!?\n')
+            if boundary != -1:
+                end = boundary + 1
             else:
                 # Look for word boundary (space)
-                for i in range(end, max(start + char_overlap, end - 100), -1):
-                    if text[i] == ' ':
-                        end = i
-                        break
+                lower = max(start + char_overlap, end - 100) + 1
+                boundary = text.rfind(' ', lower, end + 1)
+                if boundary != -1:
+                    end = boundary
         
         chunk_text = text[start:end].strip()
         